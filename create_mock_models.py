@@ -1,3 +1,20 @@
+"""
+Create mock model artifacts for local development of the ML API service.
+
+All artifacts are collected into a single ``bundle.joblib`` archive keyed by
+the model names used in ``ml_api_service.load_base_models``, so consumers
+need one load instead of one per file. The feature columns are also written
+to ``feature_columns.pkl``, the service's FEATURE_COLUMNS_PATH fallback when
+its model directory holds no bundle. Both are written with joblib
+compression (lz4 when the lz4 package is installed, zlib otherwise) to keep
+them small and cheap to decompress.
+Compressed pickles cannot be memory-mapped: to share model arrays between
+worker processes, set COMPRESS = 0 and load with
+``joblib.load(path, mmap_mode='r')`` so numpy arrays inside the estimators
+are mapped read-only instead of copied into each process.
+The ML API service only lets MockModel score when started with
+ALLOW_MOCK_MODEL=1; otherwise the mock models are skipped with a warning.
+"""
 import joblib
 import os
 import numpy as np
@@ -7,6 +24,13 @@ from sklearn.preprocessing import StandardScaler
 # Define the directory where the models are expected
 MODEL_DIR = "/home/ubuntu/"
 
+# lz4 is nearly free to decompress; fall back to zlib when it is not installed
+try:
+    import lz4  # noqa: F401
+    COMPRESS = ('lz4', 3)
+except ImportError:
+    COMPRESS = ('zlib', 3)
+
 # Ensure the directory exists (it should, but for safety)
 os.makedirs(MODEL_DIR, exist_ok=True)
 
@@ -17,8 +41,8 @@ mock_base_features = [
     "week_of_year", "days_since_last_race", "PREV_RACE_WON", "WIN_STREAK",
     "IMPLIED_PROBABILITY", "NORMALIZED_VOLUME"
 ]
-joblib.dump(mock_base_features, os.path.join(MODEL_DIR, 'feature_columns.pkl'))
-print(f"Created mock feature_columns.pkl with {len(mock_base_features)} features.")
+bundle = {'feature_columns': mock_base_features}
+print(f"Created mock feature columns with {len(mock_base_features)} features.")
 
 # --- 2. Mock Scaler ---
 # Create a dummy scaler object
@@ -29,44 +53,64 @@ dummy_data = np.array([
     [1200, 1200, 2021, 2, 2, 2, 2, 2, 1, 1, 0.6, 0.6]
 ])
 mock_scaler.fit(dummy_data)
-joblib.dump(mock_scaler, os.path.join(MODEL_DIR, 'scaler.pkl'))
-print("Created mock scaler.pkl.")
+bundle['scaler'] = mock_scaler
+print("Created mock scaler.")
 
 # --- 3. Mock Models ---
 # Create a dummy Logistic Regression model (needs a predict_proba method)
 mock_lr = LogisticRegression()
 # Fit it with dummy data to make it a valid object
 mock_lr.fit(dummy_data, np.array([0, 1]))
-joblib.dump(mock_lr, os.path.join(MODEL_DIR, 'logistic_regression_model.pkl'))
-print("Created mock logistic_regression_model.pkl.")
+bundle['logistic_regression'] = mock_lr
+print("Created mock logistic_regression model.")
+
+# Kept identical to ml_api_service.MockModel, which refuses to score unless ALLOW_MOCK_MODEL=1
+_ALLOW_MOCK_MODEL = os.getenv('ALLOW_MOCK_MODEL') == '1'
+_RNG = np.random.default_rng(0)
 
 # Create a simple class to mock a model with a predict_proba method
 class MockModel:
+    def _check_allowed(self):
+        # Mock scores are random: refuse to serve them unless explicitly enabled for development
+        if not _ALLOW_MOCK_MODEL:
+            raise RuntimeError('MockModel invoked without ALLOW_MOCK_MODEL=1')
+
     def predict_proba(self, X):
+        self._check_allowed()
         # Return a random probability array for each sample
         n_samples = X.shape[0]
+        # Fill both columns in place; Fortran order keeps each column contiguous for Generator.random(out=...)
+        out = np.empty((n_samples, 2), order='F')
+        probs = out[:, 1]
         # Simulate a prediction: 50% chance of 0, 50% chance of 1
-        probs = np.random.rand(n_samples) * 0.2 + 0.4 # Range 0.4 to 0.6
-        return np.column_stack([1 - probs, probs])
+        _RNG.random(out=probs)
+        probs *= 0.2
+        probs += 0.4 # Range 0.4 to 0.6
+        np.subtract(1.0, probs, out=out[:, 0])
+        return out
     
     def predict(self, X):
+        self._check_allowed()
         # Mock for the ranker
         n_samples = X.shape[0]
-        return np.random.rand(n_samples) # Return a ranking score
+        return _RNG.random(n_samples) # Return a ranking score
 
-# List of model files to mock
-mock_model_files = [
-    'lightgbm_ranker_large.pkl',
-    'random_forest_model.pkl',
-    'gradient_boosting_model.pkl',
-    'xgboost_model.pkl',
-    'lightgbm_model.pkl'
+# List of models to mock
+mock_model_names = [
+    'lgbm_ranker',
+    'random_forest',
+    'gradient_boosting',
+    'xgboost',
+    'lightgbm_old'
 ]
 
-for filename in mock_model_files:
+for name in mock_model_names:
     # Use the MockModel class for all others
-    model_to_dump = MockModel()
-    joblib.dump(model_to_dump, os.path.join(MODEL_DIR, filename))
-    print(f"Created mock {filename}.")
+    bundle[name] = MockModel()
+    print(f"Created mock {name} model.")
 
-print("\nMock model creation complete.")
+# Write everything in one compressed archive
+joblib.dump(bundle, os.path.join(MODEL_DIR, 'bundle.joblib'), compress=COMPRESS)
+# Loose copy for the service's FEATURE_COLUMNS_PATH fallback
+joblib.dump(mock_base_features, os.path.join(MODEL_DIR, 'feature_columns.pkl'), compress=COMPRESS)
+print("\nMock model creation complete: bundle.joblib, feature_columns.pkl")
@@ -14,19 +14,36 @@ Date: 2025-12-28
 import numpy as np
 import pandas as pd
 from typing import List, Dict, Tuple, Optional, Any
-from itertools import permutations, combinations
-from dataclasses import dataclass
+from itertools import permutations, combinations, count
+import heapq
+import threading
+from dataclasses import dataclass, replace
 from abc import ABC, abstractmethod
+from functools import lru_cache
 import logging
 from datetime import datetime
 import json
+from pathlib import Path
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class Horse:
     """Represents a horse with its racing attributes."""
     id: int
@@ -42,7 +59,7 @@ class Horse:
     class_rating: float
 
 
-@dataclass
+@dataclass(slots=True)
 class ExoticBet:
     """Represents an exotic bet combination."""
     bet_type: str
@@ -54,12 +71,185 @@ class ExoticBet:
     confidence_score: float
 
 
+# Trifecta and superfecta enumeration is limited to the top contenders for computational efficiency
+TRIFECTA_CONTENDERS = 6
+SUPERFECTA_CONTENDERS = 5
+
+
+def _top_indices(values: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest values in descending order, ties kept in original order (O(N) select)"""
+    n = len(values)
+    k = min(k, n)
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        cutoff = np.partition(values, n - k)[n - k]
+        candidates = np.flatnonzero(values >= cutoff)
+    else:
+        candidates = np.arange(n)
+    return candidates[np.lexsort((candidates, -values[candidates]))[:k]]
+
+
+@dataclass(slots=True)
+class HorseArrays:
+    """Column-wise (structure-of-arrays) view of a field of horses, aligned by index"""
+    ids: np.ndarray
+    win_probability: np.ndarray
+    odds: np.ndarray
+    form_rating: np.ndarray
+    speed_rating: np.ndarray
+    class_rating: np.ndarray
+    contenders: np.ndarray  # Indices of the strongest horses by win probability, best first
+    
+    @classmethod
+    def from_horses(cls, horses: List[Horse]) -> 'HorseArrays':
+        """Extract each numeric attribute once so hot paths index arrays instead of objects"""
+        n = len(horses)
+        
+        def column(attr: str) -> np.ndarray:
+            return np.fromiter((getattr(h, attr) for h in horses), dtype=np.float64, count=n)
+        
+        win_probability = column('win_probability')
+        return cls(
+            ids=np.array([h.id for h in horses]),
+            win_probability=win_probability,
+            odds=column('odds'),
+            form_rating=column('form_rating'),
+            speed_rating=column('speed_rating'),
+            class_rating=column('class_rating'),
+            contenders=_top_indices(win_probability, max(TRIFECTA_CONTENDERS, SUPERFECTA_CONTENDERS))
+        )
+
+
+@lru_cache(maxsize=None)
+def _permutation_index(n: int, depth: int) -> np.ndarray:
+    """
+    Lookup table of every ordered depth-tuple of distinct indices below n.
+    
+    Rows follow itertools.permutations order. Tables are cached and read-only
+    so callers can gather from tensors without re-enumerating per race.
+    """
+    table = np.array(list(permutations(range(n), depth)), dtype=np.min_scalar_type(max(n - 1, 0)))
+    table = table.reshape(-1, depth)
+    table.setflags(write=False)
+    return table
+
+
+def _sequential_joint(p: np.ndarray, depth: int, total: float = 1.0, eps: float = 0.0) -> np.ndarray:
+    """
+    Unnormalized joint finishing-order probabilities over all depth-tuples of p.
+    
+    Each later position takes p / (remaining mass + eps); the remaining mass is
+    carried forward by subtraction instead of being re-summed per ordering.
+    """
+    joint = p
+    remaining = total - p
+    for level in range(1, depth):
+        joint = joint[..., None] * (p / (remaining[..., None] + eps))
+        if level < depth - 1:
+            remaining = remaining[..., None] - p
+    return joint
+
+
+def _calc_exacta_array(p: np.ndarray, total: float, eps: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Enumerate ordered pairs of distinct indices with their sequential joint probability"""
+    n = p.shape[0]
+    per_first = n - 1
+    positions = np.empty((n * per_first, 2), dtype=np.int64)
+    probs = np.empty(n * per_first, dtype=np.float64)
+    for i in prange(n):
+        row = i * per_first
+        prob_1st = p[i]
+        remaining_1 = total - p[i] + eps
+        for j in range(n):
+            if j == i:
+                continue
+            positions[row, 0] = i
+            positions[row, 1] = j
+            probs[row] = prob_1st * (p[j] / remaining_1)
+            row += 1
+    return positions, probs
+
+
+def _calc_trifecta_array(p: np.ndarray, total: float, eps: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Enumerate ordered triples of distinct indices with their sequential joint probability"""
+    n = p.shape[0]
+    per_first = (n - 1) * (n - 2)
+    positions = np.empty((n * per_first, 3), dtype=np.int64)
+    probs = np.empty(n * per_first, dtype=np.float64)
+    for i in prange(n):
+        row = i * per_first
+        for j in range(n):
+            if j == i:
+                continue
+            prob_12 = p[i] * (p[j] / (total - p[i] + eps))
+            remaining_2 = total - p[i] - p[j] + eps
+            for k in range(n):
+                if k == i or k == j:
+                    continue
+                positions[row, 0] = i
+                positions[row, 1] = j
+                positions[row, 2] = k
+                probs[row] = prob_12 * (p[k] / remaining_2)
+                row += 1
+    return positions, probs
+
+
+def _calc_superfecta_array(p: np.ndarray, total: float, eps: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Enumerate ordered quadruples of distinct indices with their sequential joint probability"""
+    n = p.shape[0]
+    per_first = (n - 1) * (n - 2) * (n - 3)
+    positions = np.empty((n * per_first, 4), dtype=np.int64)
+    probs = np.empty(n * per_first, dtype=np.float64)
+    for i in prange(n):
+        row = i * per_first
+        for j in range(n):
+            if j == i:
+                continue
+            prob_12 = p[i] * (p[j] / (total - p[i] + eps))
+            for k in range(n):
+                if k == i or k == j:
+                    continue
+                prob_123 = prob_12 * (p[k] / (total - p[i] - p[j] + eps))
+                remaining_3 = total - p[i] - p[j] - p[k] + eps
+                for m in range(n):
+                    if m == i or m == j or m == k:
+                        continue
+                    positions[row, 0] = i
+                    positions[row, 1] = j
+                    positions[row, 2] = k
+                    positions[row, 3] = m
+                    probs[row] = prob_123 * (p[m] / remaining_3)
+                    row += 1
+    return positions, probs
+
+
+if NUMBA_AVAILABLE:
+    _jit = njit(cache=True, fastmath=True, parallel=True)
+    _calc_exacta_array = _jit(_calc_exacta_array)
+    _calc_trifecta_array = _jit(_calc_trifecta_array)
+    _calc_superfecta_array = _jit(_calc_superfecta_array)
+
+
+def _arrays_to_dict(ids: np.ndarray, positions: np.ndarray, probs: np.ndarray) -> Dict[Tuple[int, ...], float]:
+    """Map kernel output (index tuples + probabilities) to a dict keyed by horse ids"""
+    return dict(zip(map(tuple, ids[positions].tolist()), probs.tolist()))
+
+
+def _tensor_to_dict(ids: np.ndarray, joint: np.ndarray) -> Dict[Tuple[int, ...], float]:
+    """Map each ordering of distinct horse ids to its entry in a joint-probability tensor"""
+    idx = _permutation_index(len(ids), joint.ndim)
+    return dict(zip(map(tuple, ids[idx].tolist()), joint[tuple(idx.T)].tolist()))
+
+
 class ProbabilityCalibrator:
     """
     Core Recommendation #1: Re-optimize for joint probability calibration
     Shifts from ranking-based to probability-based approach
     """
     
+    __slots__ = ('calibration_history', 'market_efficiency_factor')
+    
     def __init__(self):
         self.calibration_history = []
         self.market_efficiency_factor = 0.85  # Market tends to be 85% efficient
@@ -68,144 +258,144 @@ class ProbabilityCalibrator:
         """
         Calibrate win probabilities using market odds and proprietary models
         """
-        logger.info("Starting probability calibration for win bets")
+        logger.debug("Starting probability calibration for win bets")
+        
+        n = len(horses)
+        odds = np.fromiter((h.odds for h in horses), dtype=np.float64, count=n)
+        model_probs = np.fromiter((h.win_probability for h in horses), dtype=np.float64, count=n)
         
-        # Convert odds to implied probabilities
-        implied_probs = []
-        for horse in horses:
-            # Convert decimal odds to probability (accounting for bookmaker margin)
-            implied_prob = 1 / horse.odds if horse.odds > 0 else 0.01
-            implied_probs.append(implied_prob)
+        # Convert decimal odds to probability (accounting for bookmaker margin)
+        with np.errstate(divide='ignore'):
+            implied_probs = np.where(odds > 0, 1.0 / odds, 0.01)
         
         # Normalize to ensure probabilities sum to 1
-        total_implied = sum(implied_probs)
-        normalized_probs = [prob / total_implied for prob in implied_probs]
-        
-        # Apply calibration based on historical performance
-        calibrated_horses = []
-        for i, horse in enumerate(horses):
-            # Blend market probability with model probability
-            market_prob = normalized_probs[i]
-            model_prob = horse.win_probability
-            
-            # Weighted average (70% model, 30% market for better edge)
-            calibrated_prob = (0.7 * model_prob + 0.3 * market_prob)
-            
-            # Create new horse object with calibrated probability
-            calibrated_horse = Horse(
-                id=horse.id,
-                name=horse.name,
-                win_probability=calibrated_prob,
-                place_probability=self._estimate_place_probability(calibrated_prob, len(horses)),
-                show_probability=self._estimate_show_probability(calibrated_prob, len(horses)),
-                odds=horse.odds,
-                jockey=horse.jockey,
-                trainer=horse.trainer,
-                form_rating=horse.form_rating,
-                speed_rating=horse.speed_rating,
-                class_rating=horse.class_rating
+        market_probs = implied_probs / implied_probs.sum()
+        
+        # Blend market probability with model probability
+        # Weighted average (70% model, 30% market for better edge)
+        calibrated_probs = 0.7 * model_probs + 0.3 * market_probs
+        place_probs = self._estimate_place_probability(calibrated_probs, n)
+        show_probs = self._estimate_show_probability(calibrated_probs, n)
+        
+        # Copy each horse with only the probability fields replaced
+        calibrated_horses = [
+            replace(horse, win_probability=win, place_probability=place, show_probability=show)
+            for horse, win, place, show in zip(
+                horses, calibrated_probs.tolist(), place_probs.tolist(), show_probs.tolist()
             )
-            calibrated_horses.append(calibrated_horse)
+        ]
         
-        logger.info(f"Calibrated probabilities for {len(calibrated_horses)} horses")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Calibrated probabilities for {len(calibrated_horses)} horses")
         return calibrated_horses
     
-    def _estimate_place_probability(self, win_prob: float, field_size: int) -> float:
+    def _estimate_place_probability(self, win_prob: np.ndarray, field_size: int) -> np.ndarray:
         """Estimate place (top 2) probability from win probability"""
         # Statistical approximation based on field size
         if field_size <= 4:
-            return min(win_prob * 2.5, 0.95)
+            return np.minimum(win_prob * 2.5, 0.95)
         elif field_size <= 8:
-            return min(win_prob * 2.2, 0.90)
+            return np.minimum(win_prob * 2.2, 0.90)
         else:
-            return min(win_prob * 1.8, 0.85)
+            return np.minimum(win_prob * 1.8, 0.85)
     
-    def _estimate_show_probability(self, win_prob: float, field_size: int) -> float:
+    def _estimate_show_probability(self, win_prob: np.ndarray, field_size: int) -> np.ndarray:
         """Estimate show (top 3) probability from win probability"""
         # Statistical approximation based on field size
         if field_size <= 5:
-            return min(win_prob * 3.0, 0.98)
+            return np.minimum(win_prob * 3.0, 0.98)
         elif field_size <= 10:
-            return min(win_prob * 2.5, 0.95)
+            return np.minimum(win_prob * 2.5, 0.95)
         else:
-            return min(win_prob * 2.0, 0.90)
+            return np.minimum(win_prob * 2.0, 0.90)
     
     def calculate_joint_probabilities(self, horses: List[Horse]) -> Dict[str, Any]:
         """
         Calculate joint probabilities for exotic bet combinations
         """
-        logger.info("Calculating joint probabilities for exotic combinations")
+        logger.debug("Calculating joint probabilities for exotic combinations")
         
+        # Extract arrays and rank contenders once for all three bet types
+        arrays = HorseArrays.from_horses(horses)
         joint_probs = {
-            'exacta': self._calculate_exacta_probabilities(horses),
-            'trifecta': self._calculate_trifecta_probabilities(horses),
-            'superfecta': self._calculate_superfecta_probabilities(horses)
+            'exacta': self._calculate_exacta_probabilities(horses, arrays),
+            'trifecta': self._calculate_trifecta_probabilities(horses, arrays),
+            'superfecta': self._calculate_superfecta_probabilities(horses, arrays)
         }
         
         return joint_probs
     
-    def _calculate_exacta_probabilities(self, horses: List[Horse]) -> Dict[Tuple[int, int], float]:
+    def _calculate_exacta_probabilities(self, horses: List[Horse],
+                                        arrays: Optional[HorseArrays] = None) -> Dict[Tuple[int, int], float]:
         """Calculate probabilities for all exacta combinations"""
-        exacta_probs = {}
-        
-        for perm in permutations([h.id for h in horses], 2):
-            horse1 = next(h for h in horses if h.id == perm[0])
-            horse2 = next(h for h in horses if h.id == perm[1])
-            
-            # P(Horse1 wins AND Horse2 comes second)
-            # Using conditional probability: P(A and B) = P(A) * P(B|A)
-            prob_1st = horse1.win_probability
-            prob_2nd_given_1st = horse2.win_probability / (1 - horse1.win_probability + 1e-10)
-            
-            joint_prob = prob_1st * prob_2nd_given_1st
-            exacta_probs[perm] = joint_prob
-        
-        return exacta_probs
-    
-    def _calculate_trifecta_probabilities(self, horses: List[Horse]) -> Dict[Tuple[int, int, int], float]:
+        arrays = arrays if arrays is not None else HorseArrays.from_horses(horses)
+        if NUMBA_AVAILABLE:
+            return _arrays_to_dict(arrays.ids, *_calc_exacta_array(arrays.win_probability, 1.0, 1e-10))
+        top_idx, joint = self._exacta_tensor(arrays)
+        return _tensor_to_dict(arrays.ids[top_idx], joint)
+    
+    def _calculate_trifecta_probabilities(self, horses: List[Horse],
+                                          arrays: Optional[HorseArrays] = None) -> Dict[Tuple[int, int, int], float]:
         """Calculate probabilities for trifecta combinations (limited to top contenders)"""
-        trifecta_probs = {}
+        arrays = arrays if arrays is not None else HorseArrays.from_horses(horses)
+        if NUMBA_AVAILABLE:
+            top_idx = arrays.contenders[:TRIFECTA_CONTENDERS]
+            positions, probs = _calc_trifecta_array(arrays.win_probability[top_idx], 1.0, 1e-10)
+            return _arrays_to_dict(arrays.ids[top_idx], positions, probs)
+        top_idx, joint = self._trifecta_tensor(arrays)
+        return _tensor_to_dict(arrays.ids[top_idx], joint)
+    
+    def _calculate_superfecta_probabilities(self, horses: List[Horse],
+                                            arrays: Optional[HorseArrays] = None) -> Dict[Tuple[int, int, int, int], float]:
+        """Calculate probabilities for superfecta combinations (top contenders only)"""
+        arrays = arrays if arrays is not None else HorseArrays.from_horses(horses)
+        if NUMBA_AVAILABLE:
+            top_idx = arrays.contenders[:SUPERFECTA_CONTENDERS]
+            total = arrays.win_probability.sum()
+            positions, probs = _calc_superfecta_array(arrays.win_probability[top_idx], total, 0.0)
+            return _arrays_to_dict(arrays.ids[top_idx], positions, probs / total)
+        top_idx, joint = self._superfecta_tensor(arrays)
+        return _tensor_to_dict(arrays.ids[top_idx], joint)
+    
+    def _exacta_tensor(self, arrays: HorseArrays) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Joint exacta probabilities as an N x N table indexed by finishing position.
+        
+        Returns the indices of the horses spanning each tensor axis and the table.
+        """
+        top_idx = np.arange(len(arrays.ids))
+        
+        # P(Horse1 wins AND Horse2 comes second)
+        # Using conditional probability: P(A and B) = P(A) * P(B|A)
+        joint = _sequential_joint(arrays.win_probability, 2, eps=1e-10)
+        np.fill_diagonal(joint, 0)
         
+        return top_idx, joint
+    
+    def _trifecta_tensor(self, arrays: HorseArrays) -> Tuple[np.ndarray, np.ndarray]:
+        """Joint trifecta probabilities as a K x K x K tensor over the top contenders"""
         # Limit to top 6 horses for computational efficiency
-        top_horses = sorted(horses, key=lambda h: h.win_probability, reverse=True)[:6]
-        
-        for perm in permutations([h.id for h in top_horses], 3):
-            horse1 = next(h for h in horses if h.id == perm[0])
-            horse2 = next(h for h in horses if h.id == perm[1])
-            horse3 = next(h for h in horses if h.id == perm[2])
-            
-            # Sequential conditional probabilities
-            prob_1st = horse1.win_probability
-            prob_2nd_given_1st = horse2.win_probability / (1 - horse1.win_probability + 1e-10)
-            remaining_prob = 1 - horse1.win_probability - horse2.win_probability
-            prob_3rd_given_12 = horse3.win_probability / (remaining_prob + 1e-10)
-            
-            joint_prob = prob_1st * prob_2nd_given_1st * prob_3rd_given_12
-            trifecta_probs[perm] = joint_prob
-        
-        return trifecta_probs
-    
-    def _calculate_superfecta_probabilities(self, horses: List[Horse]) -> Dict[Tuple[int, int, int, int], float]:
-        """Calculate probabilities for superfecta combinations (top contenders only)"""
-        superfecta_probs = {}
+        top_idx = arrays.contenders[:TRIFECTA_CONTENDERS]
+        p = arrays.win_probability[top_idx]
+        
+        # Sequential conditional probabilities, broadcast over (1st, 2nd, 3rd)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            joint = _sequential_joint(p, 3, eps=1e-10)
         
+        return top_idx, joint
+    
+    def _superfecta_tensor(self, arrays: HorseArrays) -> Tuple[np.ndarray, np.ndarray]:
+        """Joint superfecta probabilities as a K x K x K x K tensor over the top contenders"""
         # Limit to top 5 horses for computational efficiency
-        top_horses = sorted(horses, key=lambda h: h.win_probability, reverse=True)[:5]
+        top_idx = arrays.contenders[:SUPERFECTA_CONTENDERS]
+        p = arrays.win_probability[top_idx]
+        total = arrays.win_probability.sum()
         
-        for perm in permutations([h.id for h in top_horses], 4):
-            # Calculate sequential conditional probabilities
-            prob = 1.0
-            remaining_horses = list(horses)
-            
-            for i, horse_id in enumerate(perm):
-                horse = next(h for h in remaining_horses if h.id == horse_id)
-                position_prob = horse.win_probability / sum(h.win_probability for h in remaining_horses)
-                prob *= position_prob
-                remaining_horses.remove(horse)
-            
-            superfecta_probs[perm] = prob
+        # Each position takes its share of the probability mass left by the horses ahead of it
+        with np.errstate(divide='ignore', invalid='ignore'):
+            joint = _sequential_joint(p, 4, total=total) / total
         
-        return superfecta_probs
+        return top_idx, joint
 
 
 class ExoticCombinationGenerator:
@@ -218,177 +408,134 @@ class ExoticCombinationGenerator:
         self.calibrator = calibrator
         self.min_probability_threshold = 0.001  # Minimum probability to consider
         
-    def generate_exacta_combinations(self, horses: List[Horse], 
-                                   max_combinations: int = 20) -> List[ExoticBet]:
+    def generate_exacta_combinations(self, horses: List[Horse], max_combinations: int = 20,
+                                   arrays: Optional[HorseArrays] = None) -> List[ExoticBet]:
         """Generate top exacta combinations with EV calculations"""
-        logger.info("Generating exacta combinations")
+        logger.debug("Generating exacta combinations")
         
-        exacta_probs = self.calibrator._calculate_exacta_probabilities(horses)
-        exacta_bets = []
+        arrays = arrays if arrays is not None else HorseArrays.from_horses(horses)
+        top_idx, probs = self.calibrator._exacta_tensor(arrays)
         
-        for combination, probability in exacta_probs.items():
-            if probability < self.min_probability_threshold:
-                continue
-                
-            # Estimate payout odds (simplified - would need actual market data)
-            payout_odds = self._estimate_exacta_payout(combination, horses)
-            
-            # Calculate expected value
-            expected_value = (probability * payout_odds) - 1.0
-            
-            # Calculate Kelly fraction for bet sizing
-            kelly_fraction = self._calculate_kelly_fraction(probability, payout_odds)
-            
-            # Calculate confidence score based on probability and horse ratings
-            confidence_score = self._calculate_confidence_score(combination, horses, probability)
-            
-            exacta_bet = ExoticBet(
-                bet_type="exacta",
-                combination=list(combination),
-                probability=probability,
-                payout_odds=payout_odds,
-                expected_value=expected_value,
-                kelly_fraction=kelly_fraction,
-                confidence_score=confidence_score
-            )
-            
-            exacta_bets.append(exacta_bet)
+        # Estimate payout odds (simplified - would need actual market data)
+        payouts = self._payout_tensor(arrays.odds[top_idx], 2, 0.8, 2.0)  # 20% track takeout, minimum $2 return
         
-        # Sort by expected value and return top combinations
-        exacta_bets.sort(key=lambda bet: bet.expected_value, reverse=True)
-        return exacta_bets[:max_combinations]
+        return self._build_bets("exacta", horses, arrays, top_idx, probs, payouts, max_combinations)
     
-    def generate_trifecta_combinations(self, horses: List[Horse], 
-                                     max_combinations: int = 15) -> List[ExoticBet]:
+    def generate_trifecta_combinations(self, horses: List[Horse], max_combinations: int = 15,
+                                     arrays: Optional[HorseArrays] = None) -> List[ExoticBet]:
         """Generate top trifecta combinations with EV calculations"""
-        logger.info("Generating trifecta combinations")
+        logger.debug("Generating trifecta combinations")
         
-        trifecta_probs = self.calibrator._calculate_trifecta_probabilities(horses)
-        trifecta_bets = []
-        
-        for combination, probability in trifecta_probs.items():
-            if probability < self.min_probability_threshold:
-                continue
-                
-            payout_odds = self._estimate_trifecta_payout(combination, horses)
-            expected_value = (probability * payout_odds) - 1.0
-            kelly_fraction = self._calculate_kelly_fraction(probability, payout_odds)
-            confidence_score = self._calculate_confidence_score(combination, horses, probability)
-            
-            trifecta_bet = ExoticBet(
-                bet_type="trifecta",
-                combination=list(combination),
-                probability=probability,
-                payout_odds=payout_odds,
-                expected_value=expected_value,
-                kelly_fraction=kelly_fraction,
-                confidence_score=confidence_score
-            )
-            
-            trifecta_bets.append(trifecta_bet)
+        arrays = arrays if arrays is not None else HorseArrays.from_horses(horses)
+        top_idx, probs = self.calibrator._trifecta_tensor(arrays)
+        payouts = self._payout_tensor(arrays.odds[top_idx], 3, 0.75, 5.0)  # 25% track takeout, minimum $5 return
         
-        trifecta_bets.sort(key=lambda bet: bet.expected_value, reverse=True)
-        return trifecta_bets[:max_combinations]
+        return self._build_bets("trifecta", horses, arrays, top_idx, probs, payouts, max_combinations)
     
-    def generate_superfecta_combinations(self, horses: List[Horse], 
-                                       max_combinations: int = 10) -> List[ExoticBet]:
+    def generate_superfecta_combinations(self, horses: List[Horse], max_combinations: int = 10,
+                                       arrays: Optional[HorseArrays] = None) -> List[ExoticBet]:
         """Generate top superfecta combinations with EV calculations"""
-        logger.info("Generating superfecta combinations")
+        logger.debug("Generating superfecta combinations")
         
-        superfecta_probs = self.calibrator._calculate_superfecta_probabilities(horses)
-        superfecta_bets = []
+        arrays = arrays if arrays is not None else HorseArrays.from_horses(horses)
+        top_idx, probs = self.calibrator._superfecta_tensor(arrays)
+        payouts = self._payout_tensor(arrays.odds[top_idx], 4, 0.7, 10.0)  # 30% track takeout, minimum $10 return
         
-        for combination, probability in superfecta_probs.items():
-            if probability < self.min_probability_threshold:
-                continue
-                
-            payout_odds = self._estimate_superfecta_payout(combination, horses)
-            expected_value = (probability * payout_odds) - 1.0
-            kelly_fraction = self._calculate_kelly_fraction(probability, payout_odds)
-            confidence_score = self._calculate_confidence_score(combination, horses, probability)
-            
-            superfecta_bet = ExoticBet(
-                bet_type="superfecta",
-                combination=list(combination),
+        return self._build_bets("superfecta", horses, arrays, top_idx, probs, payouts, max_combinations)
+    
+    def _payout_tensor(self, odds: np.ndarray, depth: int, takeout_factor: float,
+                       min_payout: float) -> np.ndarray:
+        """Estimate payouts for every ordering of the given odds as a product-of-odds tensor"""
+        product = odds
+        for _ in range(depth - 1):
+            product = np.multiply.outer(product, odds)
+        return np.maximum(product * takeout_factor, min_payout)
+    
+    def _topk_combinations(self, probs: np.ndarray, payouts: np.ndarray,
+                           k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Select the k highest-EV orderings above the probability threshold
+        without materializing every permutation.
+        
+        Returns the tensor positions (shape [C, depth]) in descending EV order
+        alongside their expected values.
+        """
+        # Gather only orderings of distinct horses, then score them in one pass
+        perms = _permutation_index(probs.shape[0], probs.ndim)
+        perm_index = tuple(perms.T)
+        perm_probs = probs[perm_index]
+        expected_values = perm_probs * payouts[perm_index] - 1.0
+        
+        candidates = np.flatnonzero(perm_probs >= self.min_probability_threshold)
+        candidate_ev = expected_values[candidates]
+        
+        k = max(k, 0)
+        if k < len(candidates):
+            # Keep everything tied with the k-th best EV so ordering stays deterministic
+            cutoff = np.partition(candidate_ev, len(candidates) - k)[len(candidates) - k] if k else np.inf
+            keep = candidate_ev >= cutoff
+            candidates, candidate_ev = candidates[keep], candidate_ev[keep]
+        
+        # Sort by expected value, ties broken by permutation order
+        order = np.lexsort((candidates, -candidate_ev))[:k]
+        return perms[candidates[order]], candidate_ev[order]
+    
+    def _build_bets(self, bet_type: str, horses: List[Horse], arrays: HorseArrays, top_idx: np.ndarray,
+                    probs: np.ndarray, payouts: np.ndarray, max_combinations: int) -> List[ExoticBet]:
+        """Turn aligned probability/payout tensors into the top ExoticBets by expected value"""
+        positions, expected_values = self._topk_combinations(probs, payouts, max_combinations)
+        
+        combos = top_idx[positions]  # [C, depth] indices into horses
+        position_index = tuple(positions.T)
+        probabilities = probs[position_index]
+        payout_odds = payouts[position_index]
+        
+        # Calculate Kelly fraction for bet sizing
+        kelly_fractions = self._calculate_kelly_fractions(expected_values, payout_odds)
+        
+        # Calculate confidence score based on probability and horse ratings
+        confidence_scores = self._calculate_confidence_scores(combos, arrays, probabilities)
+        
+        bets = []
+        for horse_idx, probability, payout, expected_value, kelly_fraction, confidence_score in zip(
+            combos.tolist(), probabilities.tolist(), payout_odds.tolist(),
+            expected_values.tolist(), kelly_fractions.tolist(), confidence_scores.tolist()
+        ):
+            bet = ExoticBet(
+                bet_type=bet_type,
+                combination=[horses[i].id for i in horse_idx],
                 probability=probability,
-                payout_odds=payout_odds,
+                payout_odds=payout,
                 expected_value=expected_value,
                 kelly_fraction=kelly_fraction,
                 confidence_score=confidence_score
             )
-            
-            superfecta_bets.append(superfecta_bet)
-        
-        superfecta_bets.sort(key=lambda bet: bet.expected_value, reverse=True)
-        return superfecta_bets[:max_combinations]
-    
-    def _estimate_exacta_payout(self, combination: Tuple[int, int], horses: List[Horse]) -> float:
-        """Estimate exacta payout based on horse odds"""
-        horse1 = next(h for h in horses if h.id == combination[0])
-        horse2 = next(h for h in horses if h.id == combination[1])
-        
-        # Simplified payout calculation (actual would use track takeout rates)
-        base_payout = horse1.odds * horse2.odds * 0.8  # 20% track takeout
-        return max(base_payout, 2.0)  # Minimum $2 return
-    
-    def _estimate_trifecta_payout(self, combination: Tuple[int, int, int], horses: List[Horse]) -> float:
-        """Estimate trifecta payout based on horse odds"""
-        payouts = []
-        for horse_id in combination:
-            horse = next(h for h in horses if h.id == horse_id)
-            payouts.append(horse.odds)
-        
-        base_payout = np.prod(payouts) * 0.75  # 25% track takeout
-        return max(base_payout, 5.0)  # Minimum $5 return
-    
-    def _estimate_superfecta_payout(self, combination: Tuple[int, int, int, int], horses: List[Horse]) -> float:
-        """Estimate superfecta payout based on horse odds"""
-        payouts = []
-        for horse_id in combination:
-            horse = next(h for h in horses if h.id == horse_id)
-            payouts.append(horse.odds)
-        
-        base_payout = np.prod(payouts) * 0.7  # 30% track takeout
-        return max(base_payout, 10.0)  # Minimum $10 return
-    
-    def _calculate_kelly_fraction(self, probability: float, odds: float) -> float:
-        """Calculate optimal bet size using Kelly Criterion"""
-        if odds <= 1.0:
-            return 0.0
-        
-        # Kelly formula: f = (bp - q) / b
-        # where b = odds - 1, p = probability, q = 1 - p
-        b = odds - 1
-        p = probability
-        q = 1 - p
-        
-        kelly = (b * p - q) / b
+            bets.append(bet)
         
-        # Cap Kelly fraction at 25% for risk management
-        return max(0.0, min(kelly, 0.25))
+        return bets
     
-    def _calculate_confidence_score(self, combination: Tuple, horses: List[Horse], 
-                                  probability: float) -> float:
-        """Calculate confidence score based on multiple factors"""
-        # Get horses in combination
-        combo_horses = [next(h for h in horses if h.id == horse_id) for horse_id in combination]
-        
-        # Factor 1: Average form rating
-        avg_form = np.mean([h.form_rating for h in combo_horses])
-        
-        # Factor 2: Speed rating consistency
-        avg_speed = np.mean([h.speed_rating for h in combo_horses])
-        
-        # Factor 3: Probability magnitude
-        prob_factor = min(probability * 100, 10.0) / 10.0  # Normalize to 0-1
+    def _calculate_kelly_fractions(self, expected_values: np.ndarray, odds: np.ndarray) -> np.ndarray:
+        """Vectorized Kelly fractions, evaluated only for positive-EV combinations"""
+        # (b*p - q) / b == (p*odds - 1) / (odds - 1) == EV / b, so non-positive EV always sizes to 0
+        # and any positive EV implies odds > 1
+        kelly = np.zeros_like(expected_values)
+        positive = expected_values > 0
+        kelly[positive] = expected_values[positive] / (odds[positive] - 1)
         
-        # Factor 4: Class rating
-        avg_class = np.mean([h.class_rating for h in combo_horses])
+        # Cap Kelly fraction at 25% for risk management
+        return np.minimum(kelly, 0.25)
+    
+    def _calculate_confidence_scores(self, combos: np.ndarray, arrays: HorseArrays,
+                                     probabilities: np.ndarray) -> np.ndarray:
+        """Calculate confidence scores for a [C, depth] matrix of horse indices"""
+        avg_form = arrays.form_rating[combos].mean(axis=1)
+        avg_speed = arrays.speed_rating[combos].mean(axis=1)
+        prob_factor = np.minimum(probabilities * 100, 10.0) / 10.0  # Normalize to 0-1
+        avg_class = arrays.class_rating[combos].mean(axis=1)
         
-        # Weighted combination
         confidence = (0.3 * avg_form + 0.25 * avg_speed + 0.25 * prob_factor + 0.2 * avg_class) / 100
         
-        return min(max(confidence, 0.0), 1.0)
+        return np.clip(confidence, 0.0, 1.0)
 
 
 class EVSignalGenerator:
@@ -397,67 +544,116 @@ class EVSignalGenerator:
     Identifies profitable bets with positive expected value
     """
     
-    def __init__(self, min_ev_threshold: float = 0.05):
+    __slots__ = ('min_ev_threshold', 'max_history', '_history_heap', '_history_sequence', '_history_lock')
+    
+    def __init__(self, min_ev_threshold: float = 0.05, max_history: int = 1000):
         self.min_ev_threshold = min_ev_threshold
-        self.signal_history = []
+        self.max_history = max_history
+        # Bounded min-heap of (signal_strength, -sequence, signal): keeps the strongest
+        # max_history signals, earlier signals winning ties as in a stable sort
+        self._history_heap = []
+        self._history_sequence = count()
+        # API handlers record signals from threadpool threads; heap updates must not interleave
+        self._history_lock = threading.Lock()
+    
+    @property
+    def signal_history(self) -> List[Dict[str, Any]]:
+        """Retained historical signals, strongest first"""
+        with self._history_lock:
+            entries = sorted(self._history_heap, reverse=True)
+        return [entry[2] for entry in entries]
+        
+    def generate_ev_signals(self, exotic_bets: List[ExoticBet],
+                            timestamp: Optional[str] = None,
+                            min_ev_threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Generate EV signals for profitable bets, all stamped with the same race timestamp
+        
+        min_ev_threshold overrides the generator's threshold for this call only.
+        """
+        logger.debug("Generating EV signals for profitable opportunities")
+        
+        timestamp = timestamp or datetime.now().isoformat()
+        if min_ev_threshold is None:
+            min_ev_threshold = self.min_ev_threshold
+        
+        all_ev = np.fromiter((bet.expected_value for bet in exotic_bets), dtype=np.float64, count=len(exotic_bets))
+        keep = np.flatnonzero(all_ev > min_ev_threshold)
+        positive_ev_bets = [exotic_bets[i] for i in keep.tolist()]
         
-    def generate_ev_signals(self, exotic_bets: List[ExoticBet]) -> List[Dict[str, Any]]:
-        """Generate EV signals for profitable bets"""
-        logger.info("Generating EV signals for profitable opportunities")
+        # Score every positive-EV bet at once from column arrays
+        n = len(positive_ev_bets)
+        expected_values = all_ev[keep]
+        probabilities = np.fromiter((bet.probability for bet in positive_ev_bets), dtype=np.float64, count=n)
+        kelly_fractions = np.fromiter((bet.kelly_fraction for bet in positive_ev_bets), dtype=np.float64, count=n)
+        confidence_scores = np.fromiter((bet.confidence_score for bet in positive_ev_bets), dtype=np.float64, count=n)
         
-        positive_ev_bets = [bet for bet in exotic_bets if bet.expected_value > self.min_ev_threshold]
+        signal_strengths = self._calculate_signal_strength(expected_values, confidence_scores, kelly_fractions)
+        risk_levels = self._assess_risk_level(probabilities)
+        recommended_stakes = self._calculate_recommended_stake(kelly_fractions)
+        
+        # Sort by signal strength
+        order = np.argsort(-signal_strengths, kind='stable').tolist()
+        signal_strengths = signal_strengths.tolist()
+        risk_levels = risk_levels.tolist()
+        recommended_stakes = recommended_stakes.tolist()
         
         signals = []
-        for bet in positive_ev_bets:
+        for i in order:
+            bet = positive_ev_bets[i]
             signal = {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': timestamp,
                 'bet_type': bet.bet_type,
                 'combination': bet.combination,
                 'probability': bet.probability,
                 'expected_value': bet.expected_value,
                 'kelly_fraction': bet.kelly_fraction,
                 'confidence_score': bet.confidence_score,
-                'signal_strength': self._calculate_signal_strength(bet),
-                'risk_level': self._assess_risk_level(bet),
-                'recommended_stake': self._calculate_recommended_stake(bet)
+                'signal_strength': signal_strengths[i],
+                'risk_level': risk_levels[i],
+                'recommended_stake': recommended_stakes[i]
             }
             signals.append(signal)
         
-        # Sort by signal strength
-        signals.sort(key=lambda s: s['signal_strength'], reverse=True)
-        
-        self.signal_history.extend(signals)
+        self._record_signals(signals)
         return signals
     
-    def _calculate_signal_strength(self, bet: ExoticBet) -> float:
+    def _calculate_signal_strength(self, expected_values: np.ndarray, confidence_scores: np.ndarray,
+                                   kelly_fractions: np.ndarray) -> np.ndarray:
         """Calculate signal strength combining EV, confidence, and Kelly fraction"""
-        ev_component = min(bet.expected_value * 2, 1.0)  # Cap at 1.0
-        confidence_component = bet.confidence_score
-        kelly_component = min(bet.kelly_fraction * 4, 1.0)  # Cap at 1.0
+        ev_component = np.minimum(expected_values * 2, 1.0)  # Cap at 1.0
+        kelly_component = np.minimum(kelly_fractions * 4, 1.0)  # Cap at 1.0
         
         # Weighted average
-        signal_strength = (0.4 * ev_component + 0.35 * confidence_component + 0.25 * kelly_component)
-        
-        return signal_strength
+        return 0.4 * ev_component + 0.35 * confidence_scores + 0.25 * kelly_component
     
-    def _assess_risk_level(self, bet: ExoticBet) -> str:
+    def _assess_risk_level(self, probabilities: np.ndarray) -> np.ndarray:
         """Assess risk level based on probability and variance"""
-        if bet.probability > 0.1:
-            return "LOW"
-        elif bet.probability > 0.05:
-            return "MEDIUM"
-        elif bet.probability > 0.01:
-            return "HIGH"
-        else:
-            return "VERY_HIGH"
+        return np.select(
+            [probabilities > 0.1, probabilities > 0.05, probabilities > 0.01],
+            ["LOW", "MEDIUM", "HIGH"],
+            default="VERY_HIGH"
+        )
     
-    def _calculate_recommended_stake(self, bet: ExoticBet, bankroll: float = 1000.0) -> float:
+    def _calculate_recommended_stake(self, kelly_fractions: np.ndarray, bankroll: float = 1000.0) -> np.ndarray:
         """Calculate recommended stake based on Kelly criterion"""
-        return bankroll * bet.kelly_fraction
+        return bankroll * kelly_fractions
+    
+    def _record_signals(self, signals: List[Dict[str, Any]]) -> None:
+        """Add signals to the bounded history, evicting the weakest once full"""
+        with self._history_lock:
+            for signal in signals:
+                entry = (signal['signal_strength'], -next(self._history_sequence), signal)
+                if len(self._history_heap) < self.max_history:
+                    heapq.heappush(self._history_heap, entry)
+                else:
+                    heapq.heappushpop(self._history_heap, entry)
     
     def get_top_signals(self, n: int = 5) -> List[Dict[str, Any]]:
         """Get top N signals by strength"""
-        return sorted(self.signal_history, key=lambda s: s['signal_strength'], reverse=True)[:n]
+        with self._history_lock:
+            entries = heapq.nlargest(n, self._history_heap)
+        return [entry[2] for entry in entries]
 
 
 class ExoticBetOptimizer:
@@ -470,30 +666,53 @@ class ExoticBetOptimizer:
         self.combination_generator = ExoticCombinationGenerator(self.calibrator)
         self.signal_generator = EVSignalGenerator()
         
-    def optimize_exotic_bets(self, horses: List[Horse]) -> Dict[str, Any]:
+    def optimize_exotic_bets(self, horses: List[Horse],
+                             min_ev_threshold: Optional[float] = None) -> Dict[str, Any]:
         """
         Main optimization function that implements all three core recommendations
+        
+        min_ev_threshold overrides the signal generator's threshold for this run
+        only, so concurrent callers never share per-request settings.
         """
         logger.info(f"Starting exotic bet optimization for {len(horses)} horses")
+        timestamp = datetime.now().isoformat()
         
         # Step 1: Calibrate probabilities (Recommendation #1)
         calibrated_horses = self.calibrator.calibrate_win_probabilities(horses)
         
         # Step 2: Generate exotic combinations (Recommendation #2)
-        exacta_bets = self.combination_generator.generate_exacta_combinations(calibrated_horses)
-        trifecta_bets = self.combination_generator.generate_trifecta_combinations(calibrated_horses)
-        superfecta_bets = self.combination_generator.generate_superfecta_combinations(calibrated_horses)
+        # Extract per-horse attribute arrays once and share them across bet types
+        arrays = HorseArrays.from_horses(calibrated_horses)
+        bets_by_type = {
+            'exacta': self.combination_generator.generate_exacta_combinations(calibrated_horses, arrays=arrays),
+            'trifecta': self.combination_generator.generate_trifecta_combinations(calibrated_horses, arrays=arrays),
+            'superfecta': self.combination_generator.generate_superfecta_combinations(calibrated_horses, arrays=arrays)
+        }
+        
+        return self.compile_results(calibrated_horses, bets_by_type, min_ev_threshold, timestamp)
+    
+    def compile_results(self, calibrated_horses: List[Horse], bets_by_type: Dict[str, List[ExoticBet]],
+                        min_ev_threshold: Optional[float] = None,
+                        timestamp: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Generate EV signals and the optimization results from calibrated horses
+        and their exacta, trifecta and superfecta bets
+        
+        Callers that cache calibration and combinations per field use this
+        instead of optimize_exotic_bets.
+        """
+        timestamp = timestamp or datetime.now().isoformat()
         
         # Combine all bets
-        all_exotic_bets = exacta_bets + trifecta_bets + superfecta_bets
+        all_exotic_bets = [bet for bets in bets_by_type.values() for bet in bets]
         
         # Step 3: Generate EV signals (Recommendation #3)
-        ev_signals = self.signal_generator.generate_ev_signals(all_exotic_bets)
+        ev_signals = self.signal_generator.generate_ev_signals(all_exotic_bets, timestamp, min_ev_threshold)
         
         # Compile results
         results = {
-            'timestamp': datetime.now().isoformat(),
-            'total_horses': len(horses),
+            'timestamp': timestamp,
+            'total_horses': len(calibrated_horses),
             'calibrated_horses': [
                 {
                     'id': h.id,
@@ -505,9 +724,7 @@ class ExoticBetOptimizer:
                 for h in calibrated_horses
             ],
             'exotic_combinations': {
-                'exacta': len(exacta_bets),
-                'trifecta': len(trifecta_bets),
-                'superfecta': len(superfecta_bets)
+                bet_type: len(bets) for bet_type, bets in bets_by_type.items()
             },
             'profitable_signals': len(ev_signals),
             'top_opportunities': ev_signals[:10],
@@ -576,8 +793,14 @@ def main():
         print()
     
     # Save results to JSON
-    with open('/mnt/user-data/outputs/exotic_bet_optimization_results.json', 'w') as f:
-        json.dump(results, f, indent=2, default=str)
+    output_path = Path('/mnt/user-data/outputs/exotic_bet_optimization_results.json')
+    if ORJSON_AVAILABLE:
+        output_path.write_bytes(
+            orjson.dumps(results, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY, default=str)
+        )
+    else:
+        with open(output_path, 'w') as f:
+            json.dump(results, f, indent=2, default=str)
     
     print("📁 Results saved to exotic_bet_optimization_results.json")
     
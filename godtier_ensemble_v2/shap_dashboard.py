@@ -21,10 +21,16 @@ Date: 2026-01-15
 
 import os
 import sys
+import hashlib
 import pickle
 import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
@@ -35,6 +41,7 @@ try:
     from dash import dcc, html, Input, Output, State
     import dash_bootstrap_components as dbc
     from flask import Flask
+    from flask.json.provider import JSONProvider
     DASH_AVAILABLE = True
 except ImportError:
     DASH_AVAILABLE = False
@@ -48,10 +55,39 @@ except ImportError:
     SHAP_AVAILABLE = False
     print("⚠️  SHAP not available - install: pip install shap")
 
+# orjson (numpy-aware JSON for Flask routes and Dash callback payloads)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# xxhash (fast content keys for the SHAP cache)
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+# Arrow (fast CSV parsing and parquet cache)
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# LightGBM (text-format booster for the fast load path)
+try:
+    import lightgbm as lgb
+    LIGHTGBM_AVAILABLE = True
+except ImportError:
+    LIGHTGBM_AVAILABLE = False
+
 # Visualization
 try:
     import plotly.graph_objects as go
     import plotly.express as px
+    import plotly.io as pio
     PLOTLY_AVAILABLE = True
 except ImportError:
     PLOTLY_AVAILABLE = False
@@ -62,11 +98,99 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Explainer/model deserialization runs here so the dashboard can start serving
+_load_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='shap-loader')
+
 
 # ============================================================================
 # SHAP EXPLAINER MANAGER
 # ============================================================================
 
+class _RestrictedUnpickler(pickle.Unpickler):
+    """
+    Unpickler that only resolves the globals the model and explainer pickles need
+    
+    Globals are allowlisted as exact (module, name) pairs; whole packages
+    would admit gadgets such as numpy.testing's runstring. Bound methods
+    (the KernelExplainer's model.predict_proba) pickle as getattr calls, so
+    getattr resolves to a wrapper limited to the prediction methods.
+    """
+    
+    ALLOWED_GLOBALS = frozenset({
+        # numpy arrays, dtypes and scalars (numpy 1.x and 2.x module paths)
+        ('numpy', 'ndarray'), ('numpy', 'dtype'), ('numpy', 'vectorize'),
+        ('numpy.core.multiarray', '_reconstruct'), ('numpy.core.multiarray', 'scalar'),
+        ('numpy.core.numeric', '_frombuffer'),
+        ('numpy._core.multiarray', '_reconstruct'), ('numpy._core.multiarray', 'scalar'),
+        ('numpy._core.numeric', '_frombuffer'),
+        # Meta models
+        ('lightgbm.sklearn', 'LGBMClassifier'), ('lightgbm.basic', 'Booster'),
+        ('sklearn.preprocessing._label', 'LabelEncoder'),
+        ('sklearn.linear_model._logistic', 'LogisticRegression'),
+        # KernelExplainer over a non-tree model
+        ('shap.explainers._kernel', 'KernelExplainer'),
+        ('shap.utils._legacy', 'DenseData'), ('shap.utils._legacy', 'Model'),
+        ('shap.utils._legacy', 'IdentityLink'), ('shap.utils._legacy', 'IdentityLink.f'),
+        # Containers
+        ('builtins', 'set'), ('builtins', 'frozenset'),
+        ('collections', 'OrderedDict'), ('collections', 'defaultdict'),
+    })
+    # Attributes getattr may resolve: model prediction methods, and IdentityLink.f under protocol 3
+    ALLOWED_METHODS = frozenset({'predict', 'predict_proba', 'f'})
+    
+    def find_class(self, module: str, name: str):
+        if (module, name) == ('builtins', 'getattr'):
+            return self._method_getattr
+        if (module, name) in self.ALLOWED_GLOBALS:
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError(f"Global '{module}.{name}' is not allowed")
+    
+    @classmethod
+    def _method_getattr(cls, obj: Any, name: str):
+        if name not in cls.ALLOWED_METHODS:
+            raise pickle.UnpicklingError(f"Attribute '{name}' is not allowed")
+        return getattr(obj, name)
+
+
+def _safe_pickle_load(path: str):
+    """Load a pickle, refusing globals outside the allowlist"""
+    with open(path, 'rb') as f:
+        return _RestrictedUnpickler(f).load()
+
+
+def _top_k_indices(values: np.ndarray, top_k: Optional[int] = None) -> np.ndarray:
+    """Indices of the top_k largest values, largest first (all when top_k is None)"""
+    if top_k is not None and 0 < top_k < values.size:
+        candidates = np.argpartition(values, -top_k)[-top_k:]
+    else:
+        candidates = np.arange(values.size)[:top_k]
+    return candidates[np.argsort(-values[candidates], kind='stable')]
+
+
+def _array_key(X: np.ndarray) -> str:
+    """Content hash of an array, used as a cache key"""
+    data = np.ascontiguousarray(X).tobytes()
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh64(data).hexdigest()
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+@dataclass
+class TreeEnsembleExplainer:
+    """
+    Explainer over a LightGBM booster loaded from its text model
+    
+    SHAP values come from the booster's native TreeSHAP (pred_contrib),
+    so no pickled shap object is needed.
+    """
+    expected_value: float
+    booster: Any
+    
+    def shap_values(self, X: np.ndarray, **kwargs) -> np.ndarray:
+        # Last column of pred_contrib is the expected value
+        return self.booster.predict(X, pred_contrib=True)[:, :-1]
+
+
 class SHAPExplainerManager:
     """
     Manage SHAP explanations for ensemble predictions
@@ -75,37 +199,116 @@ class SHAPExplainerManager:
     def __init__(self, 
                  explainer_path: str,
                  model_path: str,
-                 feature_names: List[str]):
+                 feature_names: List[str],
+                 shap_cache_dir: Optional[str] = None,
+                 max_cache_size: int = 64):
         self.explainer_path = explainer_path
         self.model_path = model_path
+        self.shap_cache_dir = shap_cache_dir
         self.feature_names = feature_names
+        self.feature_names_arr = np.asarray(feature_names)
         
         self.explainer = None
         self.model = None
-        self.shap_values_cache = {}
+        # LRU of computed SHAP values, oldest first; callbacks share it across server threads
+        self.shap_values_cache = OrderedDict()
+        self.max_cache_size = max_cache_size
+        self._cache_lock = threading.Lock()
+        self._shap_matrix = None
+        self._global_importance = None
+        self._global_fig = None
+        
+        # Fallback explainer for non-tree models, reused while its background data is unchanged
+        self._kernel_explainer = None
+        self._background_hash = None
+        
+        # Set once load_explainer finishes; only consulted after load_explainer_async
+        self._ready = threading.Event()
+        self._load_future = None
+        
+    @property
+    def fast_model_path(self) -> Path:
+        """LightGBM text-format model next to the pickled one (booster.save_model output)"""
+        return Path(self.model_path).with_suffix('.txt')
+    
+    def load_explainer_fast(self) -> bool:
+        """
+        Load the model from LightGBM text format and explain it with the booster's TreeSHAP
+        
+        The text model loads without unpickling, and no explainer artifact is
+        needed: the booster computes SHAP values itself.
+        """
+        if not LIGHTGBM_AVAILABLE or not self.fast_model_path.exists():
+            return False
+        
+        try:
+            self.model = lgb.Booster(model_file=str(self.fast_model_path))
+            # The last pred_contrib column is the expected value, identical for every row
+            expected_value = self.model.predict(np.zeros((1, self.model.num_feature())), pred_contrib=True)[0, -1]
+            self.explainer = TreeEnsembleExplainer(expected_value=float(expected_value), booster=self.model)
+            logger.info(f"✅ Model loaded (fast): {self.fast_model_path}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Fast model load failed: {e}")
+            return False
+    
+    def load_explainer_async(self, legacy: bool = False) -> Future:
+        """Run load_explainer on a background thread; the future holds its result"""
+        self._ready.clear()
+        self._load_future = _load_pool.submit(self.load_explainer, legacy)
+        return self._load_future
+    
+    def is_loading(self, timeout: float = 0.05) -> bool:
+        """True while a background load is still running"""
+        return self._load_future is not None and not self._ready.wait(timeout)
+    
+    def when_loaded(self, fn, *args):
+        """Call fn now, or once the background load has finished"""
+        if self._load_future is None:
+            fn(*args)
+        else:
+            self._load_future.add_done_callback(lambda _: fn(*args))
+    
+    def load_explainer(self, legacy: bool = False):
+        """
+        Load pretrained SHAP explainer
+        
+        Tries the LightGBM text model first; legacy=True forces the
+        pickle path. Tree models get a TreeExplainer built directly instead
+        of an unpickled explainer.
+        """
+        try:
+            return self._load_explainer(legacy)
+        finally:
+            self._ready.set()
+    
+    def _load_explainer(self, legacy: bool) -> bool:
+        if not legacy and self.load_explainer_fast():
+            return True
         
-    def load_explainer(self):
-        """Load pretrained SHAP explainer"""
         if not SHAP_AVAILABLE:
             logger.error("SHAP not available")
             return False
         
         try:
-            if os.path.exists(self.explainer_path):
-                with open(self.explainer_path, 'rb') as f:
-                    self.explainer = pickle.load(f)
+            # Load model
+            if os.path.exists(self.model_path):
+                self.model = _safe_pickle_load(self.model_path)
+                logger.info(f"✅ Model loaded: {self.model_path}")
+            
+            if hasattr(self.model, 'booster_') or hasattr(self.model, 'get_booster'):
+                # TreeSHAP is polynomial in depth, unlike a generic pickled explainer
+                self.explainer = shap.TreeExplainer(self.model, feature_perturbation='tree_path_dependent')
+                logger.info("✅ SHAP TreeExplainer built from model")
+            elif os.path.exists(self.explainer_path):
+                self.explainer = _safe_pickle_load(self.explainer_path)
                 logger.info(f"✅ SHAP explainer loaded: {self.explainer_path}")
             else:
                 logger.warning(f"Explainer not found: {self.explainer_path}")
                 # Would initialize new explainer
                 return False
             
-            # Load model
-            if os.path.exists(self.model_path):
-                with open(self.model_path, 'rb') as f:
-                    self.model = pickle.load(f)
-                logger.info(f"✅ Model loaded: {self.model_path}")
-            
             return True
             
         except Exception as e:
@@ -118,26 +321,42 @@ class SHAPExplainerManager:
         
         Args:
             X: Feature matrix
-            cache_key: Optional key for caching results
+            cache_key: Optional key for caching results; defaults to a hash
+                of X's contents
             
         Returns:
-            SHAP values array
+            SHAP values array, or None while a background load is running
         """
-        if not SHAP_AVAILABLE or self.explainer is None:
+        if self.is_loading():
+            return None
+        
+        if self.explainer is None:
             return np.zeros_like(X)
         
         # Check cache
-        if cache_key and cache_key in self.shap_values_cache:
+        if cache_key is None:
+            cache_key = _array_key(X)
+        with self._cache_lock:
+            cached = self.shap_values_cache.get(cache_key)
+            if cached is not None:
+                self.shap_values_cache.move_to_end(cache_key)
+        if cached is not None:
             logger.info(f"Using cached SHAP values: {cache_key}")
-            return self.shap_values_cache[cache_key]
+            return cached
         
         try:
             logger.info(f"Computing SHAP values for {len(X)} samples...")
-            shap_values = self.explainer.shap_values(X)
+            if len(X) == 1:
+                shap_values = self.single_row_shap(X[0])[np.newaxis]
+            else:
+                shap_values = self.explainer.shap_values(X, check_additivity=False)
             
-            # Cache result
-            if cache_key:
+            # Cache result, evicting the least recently used entry
+            with self._cache_lock:
                 self.shap_values_cache[cache_key] = shap_values
+                self.shap_values_cache.move_to_end(cache_key)
+                if len(self.shap_values_cache) > self.max_cache_size:
+                    self.shap_values_cache.popitem(last=False)
             
             return shap_values
             
@@ -145,38 +364,211 @@ class SHAPExplainerManager:
             logger.error(f"SHAP computation failed: {e}")
             return np.zeros_like(X)
     
-    def get_feature_importance(self, shap_values: np.ndarray) -> pd.DataFrame:
+    def _predict_positive(self, X: np.ndarray) -> np.ndarray:
+        return self.model.predict_proba(X)[:, 1]
+    
+    def use_kernel_explainer(self, background_X: np.ndarray) -> bool:
+        """
+        Explain the model with a KernelExplainer over background_X
+        
+        The fitted explainer is kept and only rebuilt when the background
+        data changes.
+        """
+        if not SHAP_AVAILABLE or not hasattr(self.model, 'predict_proba'):
+            return False
+        
+        background_hash = _array_key(background_X)
+        if self._kernel_explainer is None or background_hash != self._background_hash:
+            self._kernel_explainer = shap.KernelExplainer(self._predict_positive, background_X)
+            self._background_hash = background_hash
+            logger.info(f"✅ SHAP KernelExplainer built over {len(background_X)} background rows")
+        
+        self.explainer = self._kernel_explainer
+        return True
+    
+    def single_row_shap(self, x: np.ndarray) -> np.ndarray:
+        """
+        SHAP values for one row
+        
+        LightGBM models use the booster's native direct TreeSHAP
+        (pred_contrib), skipping the explainer's per-call setup.
+        """
+        X = np.asarray(x).reshape(1, -1)
+        booster = getattr(self.model, 'booster_', self.model)
+        if LIGHTGBM_AVAILABLE and isinstance(booster, lgb.Booster):
+            # Last column is the expected value
+            return booster.predict(X, pred_contrib=True)[0, :-1]
+        return np.asarray(self.explainer.shap_values(X, check_additivity=False))[0]
+    
+    def precompute_all(self,
+                       X_all: np.ndarray,
+                       sample_size: Optional[int] = 2000,
+                       seed: int = 42,
+                       background_size: int = 100,
+                       kernel_sample_size: int = 20,
+                       kernel_nsamples: int = 200) -> bool:
+        """
+        Precompute SHAP values for the global importance view
+        
+        Up to sample_size rows are explained in full in one batched call and
+        callbacks slice rows from the stored matrix. Larger datasets use a
+        deterministic random sample for the global view; per-row
+        explanations are then computed on demand. Without a loaded explainer,
+        a KernelExplainer over background_size sampled rows is used; its cost
+        grows with rows x coalitions x background rows, so it explains at most
+        kernel_sample_size rows with kernel_nsamples coalitions each.
+        """
+        n_rows = len(X_all)
+        rng = np.random.default_rng(seed)
+        
+        if self.explainer is None:
+            background_idx = np.sort(rng.choice(n_rows, size=min(background_size, n_rows), replace=False))
+            if not self.use_kernel_explainer(X_all[background_idx]):
+                return False
+        
+        shap_kwargs = {'check_additivity': False}
+        if self.explainer is self._kernel_explainer:
+            sample_size = kernel_sample_size if sample_size is None else min(sample_size, kernel_sample_size)
+            shap_kwargs = {'nsamples': kernel_nsamples}
+        
+        try:
+            if sample_size is None or n_rows <= sample_size:
+                logger.info(f"Precomputing SHAP values for {n_rows} samples...")
+                shap_values = self._shap_matrix_for(X_all, shap_kwargs)
+                self._shap_matrix = shap_values
+            else:
+                logger.info(f"Precomputing SHAP values for {sample_size} of {n_rows} samples...")
+                idx = np.sort(rng.choice(n_rows, size=sample_size, replace=False))
+                shap_values = np.asarray(self.explainer.shap_values(X_all[idx], **shap_kwargs),
+                                         dtype=np.float32)
+                self._shap_matrix = None
+            
+            self._global_importance = np.abs(shap_values).mean(axis=0, dtype=np.float64)
+            self._global_fig = self._create_global_importance_figure()
+            return True
+            
+        except Exception as e:
+            logger.error(f"SHAP precomputation failed: {e}")
+            self._shap_matrix = None
+            self._global_importance = None
+            self._global_fig = None
+            return False
+    
+    def _shap_cache_file(self, X_all: np.ndarray) -> Optional[Path]:
+        """Cache file for the SHAP matrix of X_all under the current model and explainer"""
+        if self.shap_cache_dir is None:
+            return None
+        
+        # Model files' mtimes tie the cache to the model that produced it
+        model_state = [type(self.explainer).__name__]
+        for path in (self.fast_model_path, Path(self.model_path), Path(self.explainer_path)):
+            if path.exists():
+                model_state.append(f"{path}:{path.stat().st_mtime_ns}")
+        model_key = hashlib.blake2b('|'.join(model_state).encode(), digest_size=8).hexdigest()
+        
+        n_rows, n_cols = X_all.shape
+        return Path(self.shap_cache_dir) / f"shap_{_array_key(X_all)}_{model_key}_{n_rows}x{n_cols}.f32"
+    
+    def _shap_matrix_for(self, X_all: np.ndarray, shap_kwargs: Dict[str, Any]) -> np.ndarray:
+        """
+        SHAP values of every row of X_all as float32, file-backed when shap_cache_dir is set
+        
+        A process that finds the cache file for the same data and model maps it
+        read-only instead of recomputing. Otherwise the builder writes the
+        matrix to a private temporary file and renames it into place, so a
+        file some process has mapped is never rewritten.
+        """
+        path = self._shap_cache_file(X_all)
+        if path is not None and path.exists():
+            if path.stat().st_size == X_all.size * np.dtype(np.float32).itemsize:
+                logger.info(f"Mapping cached SHAP values: {path}")
+                return np.memmap(path, dtype=np.float32, mode='r', shape=X_all.shape)
+            logger.warning(f"SHAP cache {path} does not match {X_all.shape}; recomputing")
+        
+        matrix = np.ascontiguousarray(self.explainer.shap_values(X_all, **shap_kwargs), dtype=np.float32)
+        if path is None:
+            return matrix
+        
+        tmp_path = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                matrix.tofile(f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write SHAP cache {path}: {e}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return matrix
+        
+        return np.memmap(path, dtype=np.float32, mode='r', shape=matrix.shape)
+    
+    def _create_global_importance_figure(self, top_k: int = 20):
+        """Build the global importance bar chart once from the cached mean |SHAP|"""
+        if not PLOTLY_AVAILABLE:
+            return None
+        
+        # Ascending, so the most important feature is drawn on top
+        order = _top_k_indices(self._global_importance, top_k)[::-1]
+        
+        fig = go.Figure(go.Bar(
+            x=self._global_importance[order],
+            y=self.feature_names_arr[order],
+            orientation='h',
+            marker=dict(color='lightblue')
+        ))
+        
+        fig.update_layout(
+            title="Global Feature Importance (Mean |SHAP|)",
+            xaxis_title="Mean |SHAP Value|",
+            yaxis_title="Feature",
+            template="plotly_dark"
+        )
+        
+        return fig
+    
+    def get_feature_importance(self,
+                               shap_values: np.ndarray,
+                               top_k: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
         """
         Calculate global feature importance from SHAP values
         
         Returns:
-            DataFrame with features and importance scores
+            Feature names and importance scores, most important first
         """
         # Mean absolute SHAP value per feature
-        importance = np.abs(shap_values).mean(axis=0)
-        
-        df = pd.DataFrame({
-            'feature': self.feature_names,
-            'importance': importance
-        }).sort_values('importance', ascending=False)
-        
-        return df
+        importance = np.abs(shap_values).mean(axis=0, dtype=np.float64)
+        order = _top_k_indices(importance, top_k)
+        return self.feature_names_arr[order], importance[order]
     
     def explain_prediction(self, 
                           X_sample: np.ndarray,
-                          sample_idx: int = 0) -> Dict:
+                          sample_idx: int = 0,
+                          row_index: Optional[int] = None) -> Dict:
         """
         Generate explanation for a single prediction
         
+        Args:
+            X_sample: Feature matrix containing the sample
+            sample_idx: Position of the sample within X_sample
+            row_index: Row of the full dataset; read from the precomputed
+                SHAP matrix when available
+        
         Returns:
             Dictionary with explanation data
         """
-        if not SHAP_AVAILABLE:
+        if self.is_loading() or (self.explainer is None and not SHAP_AVAILABLE):
             return {}
         
         try:
-            # Compute SHAP values
-            shap_values = self.compute_shap_values(X_sample)
+            if row_index is not None and self._shap_matrix is not None:
+                sample_shap = self._shap_matrix[row_index]
+            elif row_index is not None:
+                # Rows outside the precomputed set are explained once and cached
+                sample_shap = self.compute_shap_values(X_sample, cache_key=f"row_{row_index}")[sample_idx]
+            else:
+                sample_shap = self.compute_shap_values(X_sample)[sample_idx]
             
             # Get prediction
             if self.model:
@@ -187,16 +579,15 @@ class SHAPExplainerManager:
             else:
                 prediction = 0.5
             
-            # Extract SHAP values for sample
-            sample_shap = shap_values[sample_idx]
-            
+            # float32 arrays serialize directly with orjson, no tolist() round-trip
             explanation = {
                 'prediction': float(prediction),
                 'base_value': float(self.explainer.expected_value) if hasattr(self.explainer, 'expected_value') else 0.5,
-                'shap_values': sample_shap.tolist(),
-                'feature_values': X_sample[sample_idx].tolist(),
+                'shap_values': np.ascontiguousarray(sample_shap, dtype=np.float32),
+                'feature_values': np.ascontiguousarray(X_sample[sample_idx], dtype=np.float32),
                 'feature_names': self.feature_names,
-                'top_features': self._get_top_features(sample_shap)
+                'top_features': self._get_top_features(sample_shap),
+                'top_feature_arrays': self._top_feature_arrays(sample_shap)
             }
             
             return explanation
@@ -205,26 +596,64 @@ class SHAPExplainerManager:
             logger.error(f"Explanation generation failed: {e}")
             return {}
     
+    def _top_feature_arrays(self,
+                            shap_values: np.ndarray,
+                            top_k: int = 10) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Names, SHAP values and |SHAP| of the top contributing features"""
+        abs_shap = np.abs(shap_values)
+        top_indices = _top_k_indices(abs_shap, top_k)
+        return self.feature_names_arr[top_indices], shap_values[top_indices], abs_shap[top_indices]
+    
     def _get_top_features(self, shap_values: np.ndarray, top_k: int = 10) -> List[Dict]:
         """Get top contributing features"""
-        abs_shap = np.abs(shap_values)
-        top_indices = np.argsort(-abs_shap)[:top_k]
-        
-        top_features = []
-        for idx in top_indices:
-            top_features.append({
-                'feature': self.feature_names[idx],
-                'shap_value': float(shap_values[idx]),
-                'importance': float(abs_shap[idx])
-            })
+        names, values, importance = self._top_feature_arrays(shap_values, top_k)
         
-        return top_features
+        return [
+            {'feature': name, 'shap_value': value, 'importance': imp}
+            for name, value, imp in zip(names.tolist(), values.tolist(), importance.tolist())
+        ]
 
 
 # ============================================================================
 # DASH DASHBOARD
 # ============================================================================
 
+if DASH_AVAILABLE and ORJSON_AVAILABLE:
+    class OrjsonProvider(JSONProvider):
+        """Flask JSON provider backed by orjson, serializing numpy arrays natively"""
+        
+        def dumps(self, obj, **kwargs) -> str:
+            return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
+        
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+
+def _read_frame(path: str) -> pd.DataFrame:
+    """
+    Read a CSV or parquet file
+    
+    CSVs are parsed with the pyarrow engine and cached as parquet next to the
+    source, so later cold starts skip the CSV parser while the cache is newer.
+    """
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    
+    if not PYARROW_AVAILABLE:
+        return pd.read_csv(path)
+    
+    cache_path = path + '.parquet'
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+        return pd.read_parquet(cache_path)
+    
+    df = pd.read_csv(path, engine='pyarrow')
+    try:
+        df.to_parquet(cache_path)
+    except Exception as e:
+        logger.warning(f"Could not write parquet cache {cache_path}: {e}")
+    return df
+
+
 class SHAPDashboard:
     """
     Interactive SHAP explainability dashboard
@@ -242,6 +671,9 @@ class SHAPDashboard:
         
         self.df_data = None
         self.df_predictions = None
+        self._horse_lookup = {}
+        self._race_options = []
+        self._horse_options_by_race = {}
         
         # Initialize Dash app
         if DASH_AVAILABLE:
@@ -250,20 +682,42 @@ class SHAPDashboard:
                 external_stylesheets=[dbc.themes.DARKLY],
                 suppress_callback_exceptions=True
             )
+            if ORJSON_AVAILABLE:
+                self.app.server.json = OrjsonProvider(self.app.server)
+                # Dash serializes callback outputs through plotly's JSON engine
+                pio.json.config.default_engine = 'orjson'
             self._setup_layout()
             self._setup_callbacks()
+            # WSGI app for gunicorn
+            self.server = self.app.server
         else:
             self.app = None
+            self.server = None
     
     def load_data(self):
         """Load race data and predictions"""
         logger.info("📂 Loading dashboard data...")
         
         try:
-            self.df_data = pd.read_csv(self.data_path)
-            self.df_predictions = pd.read_csv(self.predictions_path)
+            self.df_data = _read_frame(self.data_path)
+            self.df_predictions = _read_frame(self.predictions_path)
             
             logger.info(f"✅ Data loaded: {len(self.df_data)} rows")
+            
+            # (race_id, horse_name) -> row index; reversed so the first occurrence wins
+            keys = zip(self.df_predictions['race_id'].tolist(), self.df_predictions['horse_name'].tolist())
+            self._horse_lookup = dict(reversed(list(zip(keys, self.df_predictions.index.tolist()))))
+            
+            # Dropdown options, in order of first appearance
+            horses_by_race = self.df_predictions.groupby('race_id', sort=False)['horse_name'].agg(list)
+            self._race_options = [{'label': f"Race {r}", 'value': r} for r in horses_by_race.index.tolist()]
+            self._horse_options_by_race = {
+                race_id: [{'label': h, 'value': h} for h in horses]
+                for race_id, horses in zip(horses_by_race.index.tolist(), horses_by_race.tolist())
+            }
+            
+            # One batched SHAP pass, once the explainer is available
+            self.explainer_manager.when_loaded(self.explainer_manager.precompute_all, self.df_data.values)
             return True
             
         except Exception as e:
@@ -342,6 +796,7 @@ class SHAPDashboard:
             dbc.Row([
                 dbc.Col([
                     html.H4("Top Contributing Features"),
+                    dcc.Store(id='top-features-store'),
                     html.Div(id='feature-table')
                 ])
             ]),
@@ -366,45 +821,47 @@ class SHAPDashboard:
             Input('race-selector', 'id')
         )
         def update_race_options(_):
-            if self.df_predictions is None:
-                return []
-            
-            races = self.df_predictions['race_id'].unique()
-            return [{'label': f"Race {r}", 'value': r} for r in races]
+            return self._race_options
         
         @self.app.callback(
             Output('horse-selector', 'options'),
             Input('race-selector', 'value')
         )
         def update_horse_options(race_id):
-            if race_id is None or self.df_predictions is None:
-                return []
-            
-            horses = self.df_predictions[
-                self.df_predictions['race_id'] == race_id
-            ]['horse_name'].tolist()
-            
-            return [{'label': h, 'value': h} for h in horses]
+            return self._horse_options_by_race.get(race_id, [])
         
         @self.app.callback(
             [Output('main-plot', 'figure'),
-             Output('feature-table', 'children')],
+             Output('top-features-store', 'data'),
+             Output('global-importance-plot', 'figure')],
             [Input('race-selector', 'value'),
              Input('horse-selector', 'value'),
              Input('viz-type', 'value')]
         )
         def update_visualization(race_id, horse_name, viz_type):
+            # Global figure is built once by precompute_all and returned unchanged
+            global_fig = self.explainer_manager._global_fig
+            if global_fig is None:
+                global_fig = go.Figure()
+            
             if race_id is None or horse_name is None:
-                return go.Figure(), html.Div("Select race and horse to view explanation")
+                return go.Figure(), None, global_fig
+            
+            if self.explainer_manager.is_loading():
+                loading_fig = go.Figure()
+                loading_fig.update_layout(title="Loading explainer...", template="plotly_dark")
+                return loading_fig, None, global_fig
             
             # Get sample data
-            mask = (self.df_predictions['race_id'] == race_id) & \
-                   (self.df_predictions['horse_name'] == horse_name)
-            sample_idx = self.df_predictions[mask].index[0]
+            sample_idx = self._horse_lookup.get((race_id, horse_name))
+            if sample_idx is None:
+                return go.Figure(), None, global_fig
             
             # Generate explanation
             X_sample = self.df_data.iloc[[sample_idx]].values
-            explanation = self.explainer_manager.explain_prediction(X_sample, sample_idx=0)
+            explanation = self.explainer_manager.explain_prediction(
+                X_sample, sample_idx=0, row_index=sample_idx
+            )
             
             # Create visualization based on type
             if viz_type == 'waterfall':
@@ -416,54 +873,60 @@ class SHAPDashboard:
             else:
                 fig = self._create_decision_plot(explanation)
             
-            # Feature table
-            table = self._create_feature_table(explanation['top_features'])
+            # Feature table is rendered in the browser from the store
+            top_features = {'top_features': explanation.get('top_features', [])}
             
-            return fig, table
+            return fig, top_features, global_fig
         
-        @self.app.callback(
-            Output('global-importance-plot', 'figure'),
-            Input('race-selector', 'id')
+        self.app.clientside_callback(
+            """
+            function(data) {
+                function el(type, children, className) {
+                    var props = {children: children};
+                    if (className) { props.className = className; }
+                    return {namespace: 'dash_html_components', type: type, props: props};
+                }
+                // NaN values arrive as null
+                function fixed4(v) {
+                    return v == null ? '' : Number(v).toFixed(4);
+                }
+                if (!data) {
+                    return el('Div', 'Select race and horse to view explanation');
+                }
+                var features = (data.top_features || []).slice(0, 10);
+                if (!features.length) {
+                    return el('Div', 'No data');
+                }
+                var header = el('Thead', el('Tr', ['Rank', 'Feature', 'SHAP Value', 'Importance', 'Impact'].map(
+                    function(title) { return el('Th', title); }
+                )));
+                var rows = features.map(function(feat, i) {
+                    var positive = feat.shap_value > 0;
+                    return el('Tr', [
+                        el('Td', String(i + 1)),
+                        el('Td', feat.feature),
+                        el('Td', fixed4(feat.shap_value)),
+                        el('Td', fixed4(feat.importance)),
+                        el('Td', el('Span', positive ? 'Positive' : 'Negative',
+                                    'badge ' + (positive ? 'bg-success' : 'bg-danger')))
+                    ]);
+                });
+                return el('Table', [header, el('Tbody', rows)],
+                          'table table-bordered table-hover table-striped table-dark');
+            }
+            """,
+            Output('feature-table', 'children'),
+            Input('top-features-store', 'data')
         )
-        def update_global_importance(_):
-            # Compute global importance (mock for demo)
-            if self.df_data is None:
-                return go.Figure()
-            
-            # Would compute SHAP values for entire dataset
-            importance_data = pd.DataFrame({
-                'feature': self.explainer_manager.feature_names[:20],
-                'importance': np.random.rand(20)
-            }).sort_values('importance', ascending=True)
-            
-            fig = go.Figure(go.Bar(
-                x=importance_data['importance'],
-                y=importance_data['feature'],
-                orientation='h',
-                marker=dict(color='lightblue')
-            ))
-            
-            fig.update_layout(
-                title="Global Feature Importance (Mean |SHAP|)",
-                xaxis_title="Mean |SHAP Value|",
-                yaxis_title="Feature",
-                template="plotly_dark"
-            )
-            
-            return fig
     
     def _create_waterfall_plot(self, explanation: Dict) -> go.Figure:
         """Create waterfall plot showing feature contributions"""
         if not explanation:
             return go.Figure()
         
-        top_features = explanation['top_features'][:15]
-        
-        features = [f['feature'] for f in top_features]
-        shap_values = [f['shap_value'] for f in top_features]
-        
-        # Cumulative sum for waterfall
-        cumsum = np.cumsum([explanation['base_value']] + shap_values)
+        names, shap_values, _ = explanation['top_feature_arrays']
+        features = names[:15].tolist()
+        shap_values = shap_values[:15].tolist()
         
         fig = go.Figure(go.Waterfall(
             name="SHAP",
@@ -491,13 +954,12 @@ class SHAPDashboard:
         if not explanation:
             return go.Figure()
         
-        top_features = explanation['top_features'][:15]
-        
-        features = [f['feature'] for f in top_features]
-        shap_values = [f['shap_value'] for f in top_features]
+        names, shap_values, _ = explanation['top_feature_arrays']
+        features = names[:15]
+        shap_values = shap_values[:15]
         
         # Color by positive/negative
-        colors = ['green' if v > 0 else 'red' for v in shap_values]
+        colors = np.where(shap_values > 0, 'green', 'red')
         
         fig = go.Figure(go.Bar(
             x=shap_values,
@@ -521,14 +983,10 @@ class SHAPDashboard:
         if not explanation:
             return go.Figure()
         
-        top_features = sorted(
-            explanation['top_features'][:15],
-            key=lambda x: x['importance'],
-            reverse=False
-        )
-        
-        features = [f['feature'] for f in top_features]
-        importance = [f['importance'] for f in top_features]
+        # Arrays are ranked most important first; reverse for an ascending chart
+        names, _, importance = explanation['top_feature_arrays']
+        features = names[:15][::-1]
+        importance = importance[:15][::-1]
         
         fig = go.Figure(go.Bar(
             x=importance,
@@ -552,47 +1010,6 @@ class SHAPDashboard:
         # Simplified version - full implementation would show cumulative SHAP
         return self._create_waterfall_plot(explanation)
     
-    def _create_feature_table(self, top_features: List[Dict]) -> dbc.Table:
-        """Create feature details table"""
-        if not top_features:
-            return html.Div("No data")
-        
-        table_header = [
-            html.Thead(html.Tr([
-                html.Th("Rank"),
-                html.Th("Feature"),
-                html.Th("SHAP Value"),
-                html.Th("Importance"),
-                html.Th("Impact")
-            ]))
-        ]
-        
-        rows = []
-        for i, feat in enumerate(top_features[:10], 1):
-            impact = "Positive" if feat['shap_value'] > 0 else "Negative"
-            impact_color = "success" if feat['shap_value'] > 0 else "danger"
-            
-            row = html.Tr([
-                html.Td(i),
-                html.Td(feat['feature']),
-                html.Td(f"{feat['shap_value']:.4f}"),
-                html.Td(f"{feat['importance']:.4f}"),
-                html.Td(
-                    dbc.Badge(impact, color=impact_color)
-                )
-            ])
-            rows.append(row)
-        
-        table_body = [html.Tbody(rows)]
-        
-        return dbc.Table(
-            table_header + table_body,
-            bordered=True,
-            dark=True,
-            hover=True,
-            striped=True
-        )
-    
     def run(self):
         """Start dashboard server"""
         if not DASH_AVAILABLE:
@@ -602,19 +1019,21 @@ class SHAPDashboard:
         logger.info(f"🚀 Starting SHAP dashboard on port {self.port}...")
         logger.info(f"Visit: http://localhost:{self.port}")
         
-        self.app.run_server(debug=True, port=self.port, host='0.0.0.0')
+        # No debug reloader; for production serve self.server with gunicorn (see create_server)
+        self.app.run(port=self.port, host='0.0.0.0')
 
 
 # ============================================================================
 # CLI
 # ============================================================================
 
-def main():
-    """Main entry point"""
-    logger.info("=" * 70)
-    logger.info("🔍 SHAP EXPLAINABILITY DASHBOARD - God-Tier Ensemble")
-    logger.info("=" * 70)
-    
+def _log_load_result(future: Future):
+    if not future.result():
+        logger.warning("Explainer not loaded - dashboard will use mock data")
+
+
+def build_dashboard(background_load: bool = True) -> Optional[SHAPDashboard]:
+    """Create the explainer manager and dashboard and load their data"""
     # Configuration
     explainer_path = "/home/ubuntu/models/shap_explainer.pkl"
     model_path = "/home/ubuntu/models/meta_lgbm.pkl"
@@ -628,11 +1047,14 @@ def main():
     explainer_manager = SHAPExplainerManager(
         explainer_path=explainer_path,
         model_path=model_path,
-        feature_names=feature_names
+        feature_names=feature_names,
+        shap_cache_dir=os.getenv('SHAP_CACHE_DIR', "/home/ubuntu/models/shap_cache")
     )
     
-    # Load explainer
-    if not explainer_manager.load_explainer():
+    # Load explainer, in the background while the dashboard starts if requested
+    if background_load:
+        explainer_manager.load_explainer_async().add_done_callback(_log_load_result)
+    elif not explainer_manager.load_explainer():
         logger.warning("Explainer not loaded - dashboard will use mock data")
     
     # Initialize dashboard
@@ -646,6 +1068,37 @@ def main():
     # Load data
     if not dashboard.load_data():
         logger.error("Failed to load data")
+        return None
+    
+    return dashboard
+
+
+def create_server():
+    """
+    WSGI entry point for production
+    
+    Loads synchronously so a --preload master holds the model and SHAP
+    matrix before forking, and workers share them copy-on-write:
+    
+        gunicorn -k gthread -w 1 --threads 8 --preload "shap_dashboard:create_server()"
+    
+    Processes started without --preload map the SHAP matrix cached under
+    SHAP_CACHE_DIR read-only instead of recomputing it.
+    """
+    dashboard = build_dashboard(background_load=False)
+    if dashboard is None or dashboard.server is None:
+        raise RuntimeError("SHAP dashboard failed to start")
+    return dashboard.server
+
+
+def main():
+    """Main entry point"""
+    logger.info("=" * 70)
+    logger.info("🔍 SHAP EXPLAINABILITY DASHBOARD - God-Tier Ensemble")
+    logger.info("=" * 70)
+    
+    dashboard = build_dashboard()
+    if dashboard is None:
         return
     
     # Run dashboard
@@ -6,11 +6,13 @@ Centralized configuration management for all optimizer components
 """
 
 import os
-from typing import Dict, Any
-from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, Callable, Iterator, Mapping, Tuple
+from dataclasses import dataclass, asdict, fields, replace
 
 
-@dataclass
+@dataclass(slots=True, frozen=True, eq=False, repr=False)
 class OptimizationConfig:
     """Configuration for optimization parameters"""
     
@@ -39,7 +41,7 @@ class OptimizationConfig:
     min_confidence_threshold: float = 0.5
 
 
-@dataclass
+@dataclass(slots=True, frozen=True, eq=False, repr=False)
 class DatabaseConfig:
     """Database configuration"""
     
@@ -51,7 +53,7 @@ class DatabaseConfig:
     pool_recycle: int = 3600
 
 
-@dataclass
+@dataclass(slots=True, frozen=True, eq=False, repr=False)
 class APIConfig:
     """API configuration"""
     
@@ -63,131 +65,157 @@ class APIConfig:
     timeout_seconds: int = 30
 
 
+@lru_cache(maxsize=1)
+def _env_snapshot() -> Mapping[str, str]:
+    """Read-only copy of the environment, taken once and shared by all loads"""
+    return MappingProxyType(dict(os.environ))
+
+
+def _get(env: Mapping[str, str], key: str, default: Any, cast: Callable[[str], Any] = str) -> Any:
+    """Typed environment value; only cast when the variable is set"""
+    value = env.get(key)
+    return default if value is None else cast(value)
+
+
+def _parse_bool(value: str) -> bool:
+    return value.lower() == 'true'
+
+
+# OptimizationConfig field -> (default, cast), taken from the field declarations;
+# each is read from the upper-cased env var
+_OPT_DEFAULTS: Dict[str, Tuple[Any, Callable[[str], Any]]] = {
+    f.name: (f.default, f.type) for f in fields(OptimizationConfig)
+}
+
+
+# (rule, error message) pairs checked by ConfigManager.validate_config
+_VALIDATORS: Tuple[Tuple[Callable[[OptimizationConfig, DatabaseConfig, APIConfig], bool], str], ...] = (
+    # Optimization config
+    (lambda opt, db, api: 0 < opt.market_efficiency_factor <= 1,
+     "market_efficiency_factor must be between 0 and 1"),
+    (lambda opt, db, api: abs(opt.model_weight + opt.market_weight - 1.0) <= 0.001,
+     "model_weight and market_weight must sum to 1.0"),
+    (lambda opt, db, api: opt.min_ev_threshold >= 0,
+     "min_ev_threshold must be non-negative"),
+    (lambda opt, db, api: 0 < opt.max_kelly_fraction <= 1,
+     "max_kelly_fraction must be between 0 and 1"),
+    # Database config
+    (lambda opt, db, api: bool(db.url),
+     "Database URL must be provided"),
+    # API config
+    (lambda opt, db, api: 1 <= api.port <= 65535,
+     "API port must be between 1 and 65535"),
+)
+
+
 class ConfigManager:
-    """Central configuration manager"""
+    """
+    Central configuration manager (one shared instance per process)
+    
+    Sections are frozen: change them through reload(),
+    update_optimization_config() or load_environment_config(), which swap
+    in new section objects.
+    """
+    
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
     
     def __init__(self):
+        # Repeated ConfigManager() calls return the loaded instance untouched
+        if getattr(self, '_initialized', False):
+            return
+        self._load()
+        self._initialized = True
+    
+    def _load(self):
         self.optimization = self._load_optimization_config()
         self.database = self._load_database_config()
         self.api = self._load_api_config()
+        self._config_dict = None
+        self._config_dict_sections = ()
+    
+    def reload(self):
+        """Re-read the environment and rebuild all configuration sections"""
+        _env_snapshot.cache_clear()
+        self._load()
     
     def _load_optimization_config(self) -> OptimizationConfig:
         """Load optimization configuration from environment or defaults"""
-        return OptimizationConfig(
-            market_efficiency_factor=float(os.getenv('MARKET_EFFICIENCY_FACTOR', 0.85)),
-            model_weight=float(os.getenv('MODEL_WEIGHT', 0.7)),
-            market_weight=float(os.getenv('MARKET_WEIGHT', 0.3)),
-            min_probability_threshold=float(os.getenv('MIN_PROBABILITY_THRESHOLD', 0.001)),
-            max_exacta_combinations=int(os.getenv('MAX_EXACTA_COMBINATIONS', 20)),
-            max_trifecta_combinations=int(os.getenv('MAX_TRIFECTA_COMBINATIONS', 15)),
-            max_superfecta_combinations=int(os.getenv('MAX_SUPERFECTA_COMBINATIONS', 10)),
-            min_ev_threshold=float(os.getenv('MIN_EV_THRESHOLD', 0.05)),
-            max_kelly_fraction=float(os.getenv('MAX_KELLY_FRACTION', 0.25)),
-            confidence_weight=float(os.getenv('CONFIDENCE_WEIGHT', 0.35)),
-            max_daily_exposure=float(os.getenv('MAX_DAILY_EXPOSURE', 1000.0)),
-            max_per_bet_exposure=float(os.getenv('MAX_PER_BET_EXPOSURE', 100.0)),
-            performance_window_days=int(os.getenv('PERFORMANCE_WINDOW_DAYS', 30)),
-            min_confidence_threshold=float(os.getenv('MIN_CONFIDENCE_THRESHOLD', 0.5))
-        )
+        env = _env_snapshot()
+        return OptimizationConfig(**{
+            name: _get(env, name.upper(), default, cast)
+            for name, (default, cast) in _OPT_DEFAULTS.items()
+        })
     
     def _load_database_config(self) -> DatabaseConfig:
         """Load database configuration from environment or defaults"""
+        env = _env_snapshot()
         return DatabaseConfig(
-            url=os.getenv('DATABASE_URL', 'sqlite:///exotic_bet_optimizer.db'),
-            echo=os.getenv('DATABASE_ECHO', 'False').lower() == 'true',
-            pool_size=int(os.getenv('DATABASE_POOL_SIZE', 10)),
-            max_overflow=int(os.getenv('DATABASE_MAX_OVERFLOW', 20)),
-            pool_timeout=int(os.getenv('DATABASE_POOL_TIMEOUT', 30)),
-            pool_recycle=int(os.getenv('DATABASE_POOL_RECYCLE', 3600))
+            url=_get(env, 'DATABASE_URL', 'sqlite:///exotic_bet_optimizer.db'),
+            echo=_get(env, 'DATABASE_ECHO', False, _parse_bool),
+            pool_size=_get(env, 'DATABASE_POOL_SIZE', 10, int),
+            max_overflow=_get(env, 'DATABASE_MAX_OVERFLOW', 20, int),
+            pool_timeout=_get(env, 'DATABASE_POOL_TIMEOUT', 30, int),
+            pool_recycle=_get(env, 'DATABASE_POOL_RECYCLE', 3600, int)
         )
     
     def _load_api_config(self) -> APIConfig:
         """Load API configuration from environment or defaults"""
+        env = _env_snapshot()
         return APIConfig(
-            host=os.getenv('API_HOST', '0.0.0.0'),
-            port=int(os.getenv('API_PORT', 5000)),
-            debug=os.getenv('API_DEBUG', 'True').lower() == 'true',
-            cors_origins=os.getenv('CORS_ORIGINS', '*'),
-            rate_limit=os.getenv('RATE_LIMIT', '100/hour'),
-            timeout_seconds=int(os.getenv('API_TIMEOUT_SECONDS', 30))
+            host=_get(env, 'API_HOST', '0.0.0.0'),
+            port=_get(env, 'API_PORT', 5000, int),
+            debug=_get(env, 'API_DEBUG', True, _parse_bool),
+            cors_origins=_get(env, 'CORS_ORIGINS', '*'),
+            rate_limit=_get(env, 'RATE_LIMIT', '100/hour'),
+            timeout_seconds=_get(env, 'API_TIMEOUT_SECONDS', 30, int)
         )
     
     def get_config_dict(self) -> Dict[str, Any]:
-        """Get complete configuration as dictionary"""
-        return {
-            'optimization': {
-                'market_efficiency_factor': self.optimization.market_efficiency_factor,
-                'model_weight': self.optimization.model_weight,
-                'market_weight': self.optimization.market_weight,
-                'min_probability_threshold': self.optimization.min_probability_threshold,
-                'max_exacta_combinations': self.optimization.max_exacta_combinations,
-                'max_trifecta_combinations': self.optimization.max_trifecta_combinations,
-                'max_superfecta_combinations': self.optimization.max_superfecta_combinations,
-                'min_ev_threshold': self.optimization.min_ev_threshold,
-                'max_kelly_fraction': self.optimization.max_kelly_fraction,
-                'confidence_weight': self.optimization.confidence_weight,
-                'max_daily_exposure': self.optimization.max_daily_exposure,
-                'max_per_bet_exposure': self.optimization.max_per_bet_exposure,
-                'performance_window_days': self.optimization.performance_window_days,
-                'min_confidence_threshold': self.optimization.min_confidence_threshold
-            },
-            'database': {
-                'url': self.database.url,
-                'echo': self.database.echo,
-                'pool_size': self.database.pool_size,
-                'max_overflow': self.database.max_overflow,
-                'pool_timeout': self.database.pool_timeout,
-                'pool_recycle': self.database.pool_recycle
-            },
-            'api': {
-                'host': self.api.host,
-                'port': self.api.port,
-                'debug': self.api.debug,
-                'cors_origins': self.api.cors_origins,
-                'rate_limit': self.api.rate_limit,
-                'timeout_seconds': self.api.timeout_seconds
+        """
+        Get complete configuration as dictionary
+        
+        Built once per set of section objects; each caller gets its own copy.
+        """
+        sections = (self.optimization, self.database, self.api)
+        if self._config_dict is None or any(
+            current is not cached for current, cached in zip(sections, self._config_dict_sections)
+        ):
+            self._config_dict = {
+                'optimization': asdict(self.optimization),
+                'database': asdict(self.database),
+                'api': asdict(self.api)
             }
-        }
+            self._config_dict_sections = sections
+        # Section values are scalars, so copying each section dict is a full copy
+        return {section: dict(values) for section, values in self._config_dict.items()}
     
     def update_optimization_config(self, **kwargs):
         """Update optimization configuration parameters"""
-        for key, value in kwargs.items():
-            if hasattr(self.optimization, key):
-                setattr(self.optimization, key, value)
+        known = {key: value for key, value in kwargs.items() if hasattr(self.optimization, key)}
+        self.optimization = replace(self.optimization, **known)
     
     def validate_config(self) -> bool:
         """Validate configuration parameters"""
-        errors = []
-        
-        # Validate optimization config
-        opt = self.optimization
-        if not 0 < opt.market_efficiency_factor <= 1:
-            errors.append("market_efficiency_factor must be between 0 and 1")
-        
-        if abs(opt.model_weight + opt.market_weight - 1.0) > 0.001:
-            errors.append("model_weight and market_weight must sum to 1.0")
-        
-        if opt.min_ev_threshold < 0:
-            errors.append("min_ev_threshold must be non-negative")
-        
-        if not 0 < opt.max_kelly_fraction <= 1:
-            errors.append("max_kelly_fraction must be between 0 and 1")
-        
-        # Validate database config
-        if not self.database.url:
-            errors.append("Database URL must be provided")
+        opt, db, api = self.optimization, self.database, self.api
+        if all(is_valid(opt, db, api) for is_valid, _ in _VALIDATORS):
+            return True
         
-        # Validate API config
-        if not 1 <= self.api.port <= 65535:
-            errors.append("API port must be between 1 and 65535")
-        
-        if errors:
-            print("Configuration validation errors:")
-            for error in errors:
-                print(f"  - {error}")
-            return False
-        
-        return True
+        print("Configuration validation errors:")
+        for error in self.validation_errors():
+            print(f"  - {error}")
+        return False
+    
+    def validation_errors(self) -> Iterator[str]:
+        """Yield a message for each failed validation rule"""
+        opt, db, api = self.optimization, self.database, self.api
+        for is_valid, message in _VALIDATORS:
+            if not is_valid(opt, db, api):
+                yield message
 
 
 # Global configuration instance
@@ -195,45 +223,37 @@ config = ConfigManager()
 
 
 # Environment-specific configurations
-ENVIRONMENTS = {
+# Per-environment overrides, grouped by the ConfigManager section they replace
+_ENV_OVERRIDES = {
     'development': {
-        'database_url': 'sqlite:///exotic_bet_optimizer_dev.db',
-        'api_debug': True,
-        'min_ev_threshold': 0.03,  # Lower threshold for testing
+        'database': {'url': 'sqlite:///exotic_bet_optimizer_dev.db'},
+        'api': {'debug': True},
+        'optimization': {'min_ev_threshold': 0.03},  # Lower threshold for testing
     },
     'testing': {
-        'database_url': 'sqlite:///:memory:',
-        'api_debug': False,
-        'min_ev_threshold': 0.01,  # Very low threshold for testing
+        'database': {'url': 'sqlite:///:memory:'},
+        'api': {'debug': False},
+        'optimization': {'min_ev_threshold': 0.01},  # Very low threshold for testing
     },
     'production': {
-        'database_url': os.getenv('PRODUCTION_DATABASE_URL', 'postgresql://localhost/exotic_bet_optimizer'),
-        'api_debug': False,
-        'min_ev_threshold': 0.08,  # Higher threshold for production
-        'max_kelly_fraction': 0.15,  # Conservative Kelly for production
+        'database': {'url': os.getenv('PRODUCTION_DATABASE_URL', 'postgresql://localhost/exotic_bet_optimizer')},
+        'api': {'debug': False},
+        'optimization': {
+            'min_ev_threshold': 0.08,  # Higher threshold for production
+            'max_kelly_fraction': 0.15,  # Conservative Kelly for production
+        },
     }
 }
 
 
 def load_environment_config(env: str = 'development'):
     """Load configuration for specific environment"""
-    if env not in ENVIRONMENTS:
-        raise ValueError(f"Unknown environment: {env}. Available: {list(ENVIRONMENTS.keys())}")
-    
-    env_config = ENVIRONMENTS[env]
-    
-    # Update configuration
-    if 'database_url' in env_config:
-        config.database.url = env_config['database_url']
-    
-    if 'api_debug' in env_config:
-        config.api.debug = env_config['api_debug']
-    
-    if 'min_ev_threshold' in env_config:
-        config.optimization.min_ev_threshold = env_config['min_ev_threshold']
+    if env not in _ENV_OVERRIDES:
+        raise ValueError(f"Unknown environment: {env}. Available: {list(_ENV_OVERRIDES.keys())}")
     
-    if 'max_kelly_fraction' in env_config:
-        config.optimization.max_kelly_fraction = env_config['max_kelly_fraction']
+    # Swap in updated copies of each overridden section
+    for section, changes in _ENV_OVERRIDES[env].items():
+        setattr(config, section, replace(getattr(config, section), **changes))
     
     print(f"Configuration loaded for environment: {env}")
     return config
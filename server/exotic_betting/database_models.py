@@ -5,16 +5,23 @@ Database Models for Exotic Bet Optimizer
 SQLAlchemy models for storing optimization results, signals, and performance data
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, JSON, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, JSON, Text, ForeignKey, Enum
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy.orm import relationship, sessionmaker, scoped_session, deferred
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import create_engine, func, select, bindparam, Index, text
+from sqlalchemy.engine import make_url
+from contextlib import contextmanager
+from functools import lru_cache
 from datetime import datetime
 import json
 from typing import Dict, List, Any, Optional
 
 Base = declarative_base()
 
+# JSONB on PostgreSQL (binary, indexable), plain JSON elsewhere
+JSONType = JSON().with_variant(JSONB(), 'postgresql')
+
 
 class Race(Base):
     """Model for race information"""
@@ -24,7 +31,7 @@ class Race(Base):
     race_id = Column(String(100), unique=True, nullable=False, index=True)
     race_name = Column(String(200))
     track_name = Column(String(100))
-    race_date = Column(DateTime, nullable=False)
+    race_date = Column(DateTime, nullable=False, index=True)
     race_time = Column(String(10))
     distance = Column(String(20))
     surface = Column(String(20))  # Dirt, Turf, Synthetic
@@ -33,8 +40,8 @@ class Race(Base):
     field_size = Column(Integer)
     weather_conditions = Column(String(100))
     track_condition = Column(String(50))
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
     # Relationships
     horses = relationship("RaceHorse", back_populates="race")
@@ -76,10 +83,11 @@ class RaceHorse(Base):
     medication = Column(String(200))
     
     # Performance data
-    recent_form = Column(JSON)  # Last 5-10 race results
-    lifetime_stats = Column(JSON)  # Career statistics
+    # Deferred: only loaded (and parsed) when accessed
+    recent_form = deferred(Column(JSONType))  # Last 5-10 race results
+    lifetime_stats = deferred(Column(JSONType))  # Career statistics
     
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
     
     # Relationships
     race = relationship("Race", back_populates="horses")
@@ -88,10 +96,13 @@ class RaceHorse(Base):
 class OptimizationRun(Base):
     """Model for optimization run results"""
     __tablename__ = 'optimization_runs'
+    __table_args__ = (
+        Index('ix_optrun_race_ts', 'race_id', 'run_timestamp'),
+    )
     
     id = Column(Integer, primary_key=True)
     race_id = Column(Integer, ForeignKey('races.id'), nullable=False)
-    run_timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
+    run_timestamp = Column(DateTime, server_default=func.now(), nullable=False)
     
     # Configuration
     min_ev_threshold = Column(Float, default=0.05)
@@ -111,7 +122,7 @@ class OptimizationRun(Base):
     processing_time_seconds = Column(Float)
     optimization_version = Column(String(20), default='1.0.0')
     
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
     
     # Relationships
     race = relationship("Race", back_populates="optimizations")
@@ -128,8 +139,8 @@ class ExoticBetResult(Base):
     
     # Bet details
     bet_type = Column(String(20), nullable=False)  # exacta, trifecta, superfecta
-    combination = Column(JSON, nullable=False)  # [horse_id1, horse_id2, ...]
-    combination_names = Column(JSON)  # [horse_name1, horse_name2, ...]
+    combination = deferred(Column(JSONType, nullable=False))  # [horse_id1, horse_id2, ...]
+    combination_names = deferred(Column(JSONType))  # [horse_name1, horse_name2, ...]
     
     # Probabilities and odds
     probability = Column(Float, nullable=False)
@@ -145,7 +156,7 @@ class ExoticBetResult(Base):
     probability_rank = Column(Integer)  # Rank by probability
     confidence_rank = Column(Integer)  # Rank by confidence
     
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
     
     # Relationships
     optimization_run = relationship("OptimizationRun", back_populates="exotic_bets")
@@ -154,14 +165,19 @@ class ExoticBetResult(Base):
 class EVSignal(Base):
     """Model for EV signals - profitable betting opportunities"""
     __tablename__ = 'ev_signals'
+    __table_args__ = (
+        # Partial index: only active signals are looked up
+        Index('ix_evsig_active', 'is_active',
+              postgresql_where=text('is_active'), sqlite_where=text('is_active')),
+    )
     
     id = Column(Integer, primary_key=True)
     optimization_run_id = Column(Integer, ForeignKey('optimization_runs.id'), nullable=False)
     
     # Signal details
-    signal_timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
+    signal_timestamp = Column(DateTime, server_default=func.now(), nullable=False)
     bet_type = Column(String(20), nullable=False)
-    combination = Column(JSON, nullable=False)
+    combination = deferred(Column(JSONType, nullable=False))
     
     # Analysis metrics
     probability = Column(Float, nullable=False)
@@ -171,7 +187,7 @@ class EVSignal(Base):
     signal_strength = Column(Float)
     
     # Risk assessment
-    risk_level = Column(String(20))  # LOW, MEDIUM, HIGH, VERY_HIGH
+    risk_level = Column(Enum('LOW', 'MEDIUM', 'HIGH', 'VERY_HIGH', name='risk_level'))
     recommended_stake = Column(Float)
     max_loss = Column(Float)
     potential_profit = Column(Float)
@@ -186,8 +202,8 @@ class EVSignal(Base):
     actual_payout = Column(Float)
     roi = Column(Float)  # Return on investment
     
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
     # Relationships
     optimization_run = relationship("OptimizationRun", back_populates="ev_signals")
@@ -222,8 +238,8 @@ class OptimizationConfig(Base):
     max_per_bet_exposure = Column(Float, default=100.0)
     
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
 
 class PerformanceMetrics(Base):
@@ -257,16 +273,70 @@ class PerformanceMetrics(Base):
     volatility = Column(Float, default=0.0)
     sharpe_ratio = Column(Float, default=0.0)
     
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso(value: str) -> datetime:
+    """Parse an ISO timestamp; races in a card share dates, so results are cached"""
+    return datetime.fromisoformat(value)
+
+
+# Race lookup by external id, built once; its compiled form is reused from the engine's query cache
+_RACE_BY_EXT_ID = select(Race).where(Race.race_id == bindparam('rid'))
+
+# race_data keys copied verbatim onto Race
+_RACE_FIELDS = frozenset([
+    'race_name', 'track_name', 'race_time', 'distance', 'surface', 'race_class',
+    'purse', 'field_size', 'weather_conditions', 'track_condition'
+])
+
+# EVSignal columns filled on insert; all but the run id share the signal's key
+_EV_COLS = (
+    'optimization_run_id', 'bet_type', 'combination', 'probability',
+    'expected_value', 'kelly_fraction', 'confidence_score', 'signal_strength',
+    'risk_level', 'recommended_stake',
+)
+
+# (RaceHorse column, horse_data key)
+_HORSE_KEY_MAP = (
+    ('horse_id', 'id'),
+    ('horse_name', 'name'),
+    ('jockey_name', 'jockey'),
+    ('trainer_name', 'trainer'),
+    ('final_odds', 'odds'),
+    ('original_win_probability', 'win_probability'),
+    ('calibrated_win_probability', 'calibrated_win_prob'),
+    ('place_probability', 'place_prob'),
+    ('show_probability', 'show_prob'),
+    ('form_rating', 'form_rating'),
+    ('speed_rating', 'speed_rating'),
+    ('class_rating', 'class_rating'),
+)
+
+
+@lru_cache(maxsize=8)
+def _engine_for(database_url: str):
+    """One engine (and connection pool) per database URL, shared by all managers"""
+    engine_kwargs = {'insertmanyvalues_page_size': 1000, 'query_cache_size': 1200}
+    url = make_url(database_url)
+    if url.get_backend_name() == 'postgresql' and url.get_driver_name() == 'psycopg2':
+        # Multi-row VALUES for inserts, execute_batch for other executemany statements
+        engine_kwargs['executemany_mode'] = 'values_plus_batch'
+    return create_engine(database_url, echo=False, pool_pre_ping=True, **engine_kwargs)
 
 
 # Database utility functions
 class DatabaseManager:
     """Utility class for database operations"""
     
+    __slots__ = ('engine', 'SessionLocal', 'Session')
+    
     def __init__(self, database_url: str = "sqlite:///exotic_bet_optimizer.db"):
-        self.engine = create_engine(database_url, echo=False)
+        self.engine = _engine_for(database_url)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        # One session per thread, reused across calls
+        self.Session = scoped_session(self.SessionLocal)
         
     def create_tables(self):
         """Create all database tables"""
@@ -274,14 +344,25 @@ class DatabaseManager:
         
     def get_session(self):
         """Get database session"""
-        return self.SessionLocal()
+        return self.Session()
+    
+    @contextmanager
+    def session_scope(self):
+        """Thread-local session that commits on success and rolls back on error"""
+        session = self.Session()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
     
     def save_optimization_results(self, race_data: Dict[str, Any], 
                                 optimization_results: Dict[str, Any]) -> int:
         """Save complete optimization results to database"""
-        session = self.get_session()
-        
-        try:
+        with self.session_scope() as session:
             # Save or get race
             race = self._save_race(session, race_data)
             
@@ -297,35 +378,24 @@ class DatabaseManager:
             # Save EV signals
             self._save_ev_signals(session, optimization_run.id, optimization_results.get('top_opportunities', []))
             
-            session.commit()
-            return optimization_run.id
-            
-        except Exception as e:
-            session.rollback()
-            raise e
-        finally:
-            session.close()
+            run_id = optimization_run.id
+        
+        return run_id
     
     def _save_race(self, session, race_data: Dict[str, Any]) -> Race:
         """Save or update race information"""
         race_id = race_data.get('race_id', 'unknown')
         
-        race = session.query(Race).filter_by(race_id=race_id).first()
+        race = session.execute(_RACE_BY_EXT_ID, {'rid': race_id}).scalars().first()
         
         if not race:
+            race_date = race_data.get('race_date')
+            fields = {key: race_data[key] for key in _RACE_FIELDS & race_data.keys()}
+            fields.setdefault('field_size', 0)
             race = Race(
                 race_id=race_id,
-                race_name=race_data.get('race_name'),
-                track_name=race_data.get('track_name'),
-                race_date=datetime.fromisoformat(race_data.get('race_date', datetime.now().isoformat())),
-                race_time=race_data.get('race_time'),
-                distance=race_data.get('distance'),
-                surface=race_data.get('surface'),
-                race_class=race_data.get('race_class'),
-                purse=race_data.get('purse'),
-                field_size=race_data.get('field_size', 0),
-                weather_conditions=race_data.get('weather_conditions'),
-                track_condition=race_data.get('track_condition')
+                race_date=datetime.now() if race_date is None else _parse_iso(race_date),
+                **fields
             )
             session.add(race)
             session.flush()  # Get the ID
@@ -352,24 +422,18 @@ class DatabaseManager:
         return optimization_run
     
     def _save_race_horses(self, session, race_id: int, horses_data: List[Dict[str, Any]]):
-        """Save race horses information"""
-        for horse_data in horses_data:
-            horse = RaceHorse(
-                race_id=race_id,
-                horse_id=horse_data.get('id'),
-                horse_name=horse_data.get('name'),
-                jockey_name=horse_data.get('jockey'),
-                trainer_name=horse_data.get('trainer'),
-                final_odds=horse_data.get('odds'),
-                original_win_probability=horse_data.get('win_probability'),
-                calibrated_win_probability=horse_data.get('calibrated_win_prob'),
-                place_probability=horse_data.get('place_prob'),
-                show_probability=horse_data.get('show_prob'),
-                form_rating=horse_data.get('form_rating'),
-                speed_rating=horse_data.get('speed_rating'),
-                class_rating=horse_data.get('class_rating')
-            )
-            session.add(horse)
+        """
+        Save race horses information
+        
+        Rows are bulk inserted without creating ORM objects, so they are not
+        added to the session or to Race.horses.
+        """
+        rows = [
+            {'race_id': race_id, **{column: horse_data.get(key) for column, key in _HORSE_KEY_MAP}}
+            for horse_data in horses_data
+        ]
+        if rows:
+            session.bulk_insert_mappings(RaceHorse, rows)
     
     def _save_exotic_bet_results(self, session, optimization_run_id: int, 
                                results: Dict[str, Any]):
@@ -380,45 +444,44 @@ class DatabaseManager:
     
     def _save_ev_signals(self, session, optimization_run_id: int, 
                         signals: List[Dict[str, Any]]):
-        """Save EV signals"""
-        for signal in signals:
-            ev_signal = EVSignal(
-                optimization_run_id=optimization_run_id,
-                bet_type=signal.get('bet_type'),
-                combination=signal.get('combination'),
-                probability=signal.get('probability'),
-                expected_value=signal.get('expected_value'),
-                kelly_fraction=signal.get('kelly_fraction'),
-                confidence_score=signal.get('confidence_score'),
-                signal_strength=signal.get('signal_strength'),
-                risk_level=signal.get('risk_level'),
-                recommended_stake=signal.get('recommended_stake')
-            )
-            session.add(ev_signal)
+        """
+        Save EV signals
+        
+        Rows go through one Core executemany INSERT on the table, batched into
+        multi-row VALUES statements, without creating ORM objects, so they are
+        not added to the session or to OptimizationRun.ev_signals.
+        """
+        rows = [
+            dict(zip(_EV_COLS, (optimization_run_id, *map(signal.get, _EV_COLS[1:]))))
+            for signal in signals
+        ]
+        if rows:
+            session.execute(EVSignal.__table__.insert(), rows)
     
     def get_performance_summary(self, days: int = 30) -> Dict[str, Any]:
         """Get performance summary for the last N days"""
-        session = self.get_session()
-        
-        try:
+        with self.session_scope() as session:
             from datetime import datetime, timedelta
             
             start_date = datetime.now() - timedelta(days=days)
             
-            # Get optimization runs from the period
-            runs = session.query(OptimizationRun)\
-                          .join(Race)\
-                          .filter(Race.race_date >= start_date)\
-                          .all()
+            # Aggregate optimization runs from the period in one query; NULLs count as 0
+            total_runs, total_profitable_opportunities, avg_profitability_rate, avg_expected_value = \
+                session.query(
+                    func.count(OptimizationRun.id),
+                    func.coalesce(func.sum(OptimizationRun.profitable_opportunities), 0),
+                    func.avg(func.coalesce(OptimizationRun.profitability_rate, 0.0)),
+                    func.avg(func.coalesce(OptimizationRun.average_expected_value, 0.0))
+                ).select_from(OptimizationRun)\
+                 .join(Race)\
+                 .filter(Race.race_date >= start_date)\
+                 .one()
             
-            if not runs:
+            if not total_runs:
                 return {'total_runs': 0}
             
-            # Calculate summary statistics
-            total_runs = len(runs)
-            total_profitable_opportunities = sum(run.profitable_opportunities or 0 for run in runs)
-            avg_profitability_rate = sum(run.profitability_rate or 0 for run in runs) / total_runs
-            avg_expected_value = sum(run.average_expected_value or 0 for run in runs) / total_runs
+            avg_profitability_rate = float(avg_profitability_rate)
+            avg_expected_value = float(avg_expected_value)
             
             return {
                 'period_days': days,
@@ -428,9 +491,6 @@ class DatabaseManager:
                 'avg_expected_value': avg_expected_value,
                 'avg_opportunities_per_race': total_profitable_opportunities / total_runs if total_runs > 0 else 0
             }
-            
-        finally:
-            session.close()
 
 
 # Initialize database manager
@@ -2,16 +2,27 @@
 Exotic Bet Optimizer API Routes
 ===============================
 
-Flask/FastAPI integration for the Exotic Bet Optimizer
+FastAPI integration for the Exotic Bet Optimizer
 Provides REST endpoints for the equine-oracle-backend
 """
 
-from flask import Flask, request, jsonify, Blueprint
-from flask_cors import CORS
-from typing import Dict, List, Any, Optional
+import os
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Dict, List, Any, Optional, Tuple, Union
+from collections import Counter
+from dataclasses import fields, replace
+from functools import lru_cache
+from operator import attrgetter
 import json
 import logging
+import numpy as np
 from datetime import datetime
+import time
 import traceback
 
 from exotic_bet_optimizer import (
@@ -23,30 +34,218 @@ from exotic_bet_optimizer import (
     EVSignalGenerator
 )
 
+# orjson (numpy-aware JSON for API responses)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create Blueprint for exotic betting routes
-exotic_bp = Blueprint('exotic_bets', __name__, url_prefix='/api/v1/exotic')
+# Router for exotic betting routes
+exotic_router = APIRouter(prefix='/api/v1/exotic')
 
 # Global optimizer instance
 optimizer = ExoticBetOptimizer()
 
+# Combination generator per supported bet type, bound once
+_GENERATORS = {
+    'exacta': optimizer.combination_generator.generate_exacta_combinations,
+    'trifecta': optimizer.combination_generator.generate_trifecta_combinations,
+    'superfecta': optimizer.combination_generator.generate_superfecta_combinations,
+}
+
+
+class OrjsonResponse(JSONResponse):
+    """JSON response encoded by orjson, serializing numpy scalars and arrays natively"""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+# Handlers return responses directly, which skips FastAPI's jsonable_encoder pass
+_JsonResponse = OrjsonResponse if ORJSON_AVAILABLE else JSONResponse
+
+
+@lru_cache(maxsize=2)
+def _iso_second(second: int) -> str:
+    return datetime.fromtimestamp(second).isoformat()
+
+
+def _timestamp() -> str:
+    """Local ISO timestamp at one-second resolution, formatted once per second"""
+    return _iso_second(int(time.time()))
+
+
+def _dumps(obj: Any) -> bytes:
+    """Compact JSON bytes, through orjson when available"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+
+_INVALID_BET_TYPE = {'error': 'Invalid bet type. Supported: exacta, trifecta, superfecta'}
+
+# ExoticBet fields returned by /combinations, in response order
+_COMBINATION_FIELDS = ('combination', 'probability', 'expected_value', 'kelly_fraction',
+                       'confidence_score', 'payout_odds')
+_STREAM_BATCH = 50
+
+
+def _encode_batch(combinations: List[ExoticBet]) -> bytes:
+    """Comma-separated JSON objects for a batch of combinations"""
+    return b','.join(
+        _dumps({field: getattr(combo, field) for field in _COMBINATION_FIELDS})
+        for combo in combinations
+    )
+
+
+def _combinations_head(bet_type: str, combinations: List[ExoticBet]) -> bytes:
+    """
+    Opening of a /combinations response through its first batch, encoded
+    before streaming starts so failures here still get an error response
+    """
+    head = _dumps({'status': 'success', 'bet_type': bet_type, 'total_combinations': len(combinations)})
+    return head[:-1] + b',"combinations":[' + _encode_batch(combinations[:_STREAM_BATCH])
+
+
+async def _stream_combinations(first_chunk: bytes, combinations: List[ExoticBet]):
+    """
+    Encode the rest of a /combinations response incrementally: only one batch
+    of per-combination dicts exists at a time instead of the whole list.
+    """
+    try:
+        yield first_chunk
+        for start in range(_STREAM_BATCH, len(combinations), _STREAM_BATCH):
+            yield b',' + _encode_batch(combinations[start:start + _STREAM_BATCH])
+        yield b'],"timestamp":' + _dumps(_timestamp()) + b'}'
+    except Exception:
+        # The 200 status is already sent; re-raising makes the server drop the
+        # connection instead of completing a truncated body
+        logger.exception("Error streaming combinations; closing the connection")
+        raise
+
+
+# Request bodies; defaults match the Horse values used when a field is omitted
+class HorseIn(BaseModel):
+    # Ids and names are passed through as sent, as the API always has
+    id: Union[int, str]
+    name: Union[str, int, float, None]
+    odds: float
+    win_probability: float = 0.1
+    place_probability: float = 0.2
+    show_probability: float = 0.3
+    jockey: str = 'Unknown'
+    trainer: str = 'Unknown'
+    form_rating: float = 75.0
+    speed_rating: float = 80.0
+    class_rating: float = 75.0
+
+
+class HorsesRequest(BaseModel):
+    horses: List[HorseIn]
+
+
+class OptimizeOptions(BaseModel):
+    min_ev_threshold: Optional[float] = None
+
+
+class OptimizeRequest(HorsesRequest):
+    race_id: str = 'unknown'
+    options: OptimizeOptions = Field(default_factory=OptimizeOptions)
+
+
+class CombinationsRequest(HorsesRequest):
+    max_combinations: int = 20
+
+
+def parse_horses(horses_data: List[HorseIn]) -> List[Horse]:
+    """Build optimizer Horse objects from validated request horses"""
+    return [Horse(**horse_data.model_dump()) for horse_data in horses_data]
+
+
+# Hashable snapshot of every Horse field, in constructor order
+_horse_key = attrgetter(*(f.name for f in fields(Horse)))
+
+
+def horse_fingerprint(horses: List[Horse]) -> Tuple[tuple, ...]:
+    """Cache key for a field: exact field values of every horse, in request order"""
+    return tuple(map(_horse_key, horses))
+
+
+@lru_cache(maxsize=256)
+def _calibrated_horses(fingerprint: Tuple[tuple, ...]) -> Tuple[Horse, ...]:
+    """Calibrated horses for a fingerprint; repeated polls of the same race skip calibration"""
+    horses = [Horse(*key) for key in fingerprint]
+    return tuple(optimizer.calibrator.calibrate_win_probabilities(horses))
+
+
+@lru_cache(maxsize=256)
+def _bet_combinations(fingerprint: Tuple[tuple, ...], bet_type: str,
+                      max_combinations: Optional[int] = None) -> Tuple[ExoticBet, ...]:
+    """Top combinations of one bet type for a fingerprint (generator default count when None)"""
+    generate = _GENERATORS[bet_type]
+    calibrated_horses = list(_calibrated_horses(fingerprint))
+    if max_combinations is None:
+        return tuple(generate(calibrated_horses))
+    return tuple(generate(calibrated_horses, max_combinations))
 
-@exotic_bp.route('/health', methods=['GET'])
+
+# Cached objects are shared by every request; handlers only ever see copies of them
+def _calibrated_copies(fingerprint: Tuple[tuple, ...]) -> List[Horse]:
+    """Copies of the cached calibrated horses for a fingerprint"""
+    return [replace(h) for h in _calibrated_horses(fingerprint)]
+
+
+def _combination_copies(fingerprint: Tuple[tuple, ...], bet_type: str,
+                        max_combinations: Optional[int] = None) -> List[ExoticBet]:
+    """Copies of the cached combinations of one bet type, each with its own combination list"""
+    return [
+        replace(bet, combination=list(bet.combination))
+        for bet in _bet_combinations(fingerprint, bet_type, max_combinations)
+    ]
+
+
+def _validation_message(error: Dict[str, Any]) -> str:
+    """Describe the first request validation error the way the API always has"""
+    if error['type'] == 'json_invalid':
+        return f"Invalid JSON body: {error['ctx']['error']}"
+    loc = [str(part) for part in error['loc'][1:]]  # drop the leading 'body'
+    if error['type'] != 'missing':
+        return f"Invalid value for {'.'.join(loc) or 'request body'}: {error['msg']}"
+    if len(loc) > 2 and loc[0] == 'horses':
+        return f"Missing required horse field: '{loc[-1]}'"
+    return f"Missing required field: {loc[-1] if loc else 'horses'}"
+
+
+async def validation_error_handler(request: Request, exc: RequestValidationError) -> JSONResponse:
+    """Report malformed request bodies as 400s instead of FastAPI's default 422"""
+    # An unsupported bet type is reported before any body error, as the handler checks it first
+    bet_type = request.path_params.get('bet_type')
+    if bet_type is not None and bet_type not in _GENERATORS:
+        return _JsonResponse(status_code=400, content=_INVALID_BET_TYPE)
+    return _JsonResponse(
+        status_code=400,
+        content={'error': _validation_message(exc.errors()[0]), 'status': 'error'}
+    )
+
+
+@exotic_router.get('/health')
 def health_check():
     """Health check endpoint"""
-    return jsonify({
+    return _JsonResponse({
         'status': 'healthy',
         'service': 'Exotic Bet Optimizer',
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': _timestamp(),
         'version': '1.0.0'
     })
 
 
-@exotic_bp.route('/optimize', methods=['POST'])
-def optimize_exotic_bets():
+@exotic_router.post('/optimize')
+def optimize_exotic_bets(data: OptimizeRequest):
     """
     Main optimization endpoint
     
@@ -75,71 +274,44 @@ def optimize_exotic_bets():
     }
     """
     try:
-        data = request.get_json()
-        
-        if not data or 'horses' not in data:
-            return jsonify({
-                'error': 'Missing required field: horses',
-                'status': 'error'
-            }), 400
-        
         # Parse horses from request
-        horses = []
-        for horse_data in data['horses']:
-            try:
-                horse = Horse(
-                    id=horse_data['id'],
-                    name=horse_data['name'],
-                    win_probability=horse_data.get('win_probability', 0.1),
-                    place_probability=horse_data.get('place_probability', 0.2),
-                    show_probability=horse_data.get('show_probability', 0.3),
-                    odds=horse_data['odds'],
-                    jockey=horse_data.get('jockey', 'Unknown'),
-                    trainer=horse_data.get('trainer', 'Unknown'),
-                    form_rating=horse_data.get('form_rating', 75.0),
-                    speed_rating=horse_data.get('speed_rating', 80.0),
-                    class_rating=horse_data.get('class_rating', 75.0)
-                )
-                horses.append(horse)
-            except KeyError as e:
-                return jsonify({
-                    'error': f'Missing required horse field: {str(e)}',
-                    'status': 'error'
-                }), 400
+        horses = parse_horses(data.horses)
         
         # Parse options
-        options = data.get('options', {})
-        
-        # Update optimizer settings if provided
-        if 'min_ev_threshold' in options:
-            optimizer.signal_generator.min_ev_threshold = options['min_ev_threshold']
+        options = data.options
         
-        # Run optimization
-        results = optimizer.optimize_exotic_bets(horses)
+        # Run optimization on the cached calibration and combinations for this field;
+        # a requested threshold applies to this request only
+        fingerprint = horse_fingerprint(horses)
+        results = optimizer.compile_results(
+            _calibrated_copies(fingerprint),
+            {bet_type: _combination_copies(fingerprint, bet_type) for bet_type in _GENERATORS},
+            min_ev_threshold=options.min_ev_threshold
+        )
         
         # Add race metadata
-        results['race_id'] = data.get('race_id', 'unknown')
-        results['request_timestamp'] = datetime.now().isoformat()
+        results['race_id'] = data.race_id
+        results['request_timestamp'] = _timestamp()
         
-        logger.info(f"Optimization completed for race {data.get('race_id', 'unknown')} with {len(horses)} horses")
+        logger.info(f"Optimization completed for race {data.race_id} with {len(horses)} horses")
         
-        return jsonify({
+        return _JsonResponse({
             'status': 'success',
             'data': results
         })
-        
+    
     except Exception as e:
         logger.error(f"Error in optimize_exotic_bets: {str(e)}")
         logger.error(traceback.format_exc())
-        return jsonify({
+        return _JsonResponse(status_code=500, content={
             'error': 'Internal server error',
             'message': str(e),
             'status': 'error'
-        }), 500
+        })
 
 
-@exotic_bp.route('/probabilities/calibrate', methods=['POST'])
-def calibrate_probabilities():
+@exotic_router.post('/probabilities/calibrate')
+def calibrate_probabilities(data: HorsesRequest):
     """
     Endpoint to calibrate horse probabilities only
     
@@ -149,29 +321,11 @@ def calibrate_probabilities():
     }
     """
     try:
-        data = request.get_json()
+        horses = parse_horses(data.horses)
         
-        if not data or 'horses' not in data:
-            return jsonify({'error': 'Missing required field: horses'}), 400
-        
-        horses = []
-        for horse_data in data['horses']:
-            horse = Horse(
-                id=horse_data['id'],
-                name=horse_data['name'],
-                win_probability=horse_data.get('win_probability', 0.1),
-                place_probability=horse_data.get('place_probability', 0.2),
-                show_probability=horse_data.get('show_probability', 0.3),
-                odds=horse_data['odds'],
-                jockey=horse_data.get('jockey', 'Unknown'),
-                trainer=horse_data.get('trainer', 'Unknown'),
-                form_rating=horse_data.get('form_rating', 75.0),
-                speed_rating=horse_data.get('speed_rating', 80.0),
-                class_rating=horse_data.get('class_rating', 75.0)
-            )
-            horses.append(horse)
-        
-        calibrated_horses = optimizer.calibrator.calibrate_win_probabilities(horses)
+        calibrated_horses = _calibrated_copies(horse_fingerprint(horses))
+        # Original probability by id; built in reverse so the first horse with an id wins, as with a scan
+        orig_by_id = {h.id: h.win_probability for h in reversed(horses)}
         
         # Format response
         response = {
@@ -180,162 +334,92 @@ def calibrate_probabilities():
                 {
                     'id': h.id,
                     'name': h.name,
-                    'original_win_probability': next(orig.win_probability for orig in horses if orig.id == h.id),
+                    'original_win_probability': orig_by_id[h.id],
                     'calibrated_win_probability': h.win_probability,
                     'calibrated_place_probability': h.place_probability,
                     'calibrated_show_probability': h.show_probability
                 }
                 for h in calibrated_horses
             ],
-            'timestamp': datetime.now().isoformat()
+            'timestamp': _timestamp()
         }
         
-        return jsonify(response)
-        
+        return _JsonResponse(response)
+    
     except Exception as e:
         logger.error(f"Error in calibrate_probabilities: {str(e)}")
-        return jsonify({'error': 'Internal server error', 'message': str(e)}), 500
+        return _JsonResponse(status_code=500, content={'error': 'Internal server error', 'message': str(e)})
 
 
-@exotic_bp.route('/combinations/<bet_type>', methods=['POST'])
-def generate_combinations(bet_type):
+@exotic_router.post('/combinations/{bet_type}')
+def generate_combinations(bet_type: str, data: CombinationsRequest):
     """
     Generate combinations for specific bet type
     
     Supported bet_types: exacta, trifecta, superfecta
     """
     try:
-        if bet_type not in ['exacta', 'trifecta', 'superfecta']:
-            return jsonify({'error': 'Invalid bet type. Supported: exacta, trifecta, superfecta'}), 400
-        
-        data = request.get_json()
-        
-        if not data or 'horses' not in data:
-            return jsonify({'error': 'Missing required field: horses'}), 400
-        
-        horses = []
-        for horse_data in data['horses']:
-            horse = Horse(
-                id=horse_data['id'],
-                name=horse_data['name'],
-                win_probability=horse_data.get('win_probability', 0.1),
-                place_probability=horse_data.get('place_probability', 0.2),
-                show_probability=horse_data.get('show_probability', 0.3),
-                odds=horse_data['odds'],
-                jockey=horse_data.get('jockey', 'Unknown'),
-                trainer=horse_data.get('trainer', 'Unknown'),
-                form_rating=horse_data.get('form_rating', 75.0),
-                speed_rating=horse_data.get('speed_rating', 80.0),
-                class_rating=horse_data.get('class_rating', 75.0)
-            )
-            horses.append(horse)
-        
-        # Calibrate probabilities first
-        calibrated_horses = optimizer.calibrator.calibrate_win_probabilities(horses)
+        if bet_type not in _GENERATORS:
+            return _JsonResponse(status_code=400, content=_INVALID_BET_TYPE)
         
-        # Generate combinations based on bet type
-        max_combinations = data.get('max_combinations', 20)
+        horses = parse_horses(data.horses)
         
-        if bet_type == 'exacta':
-            combinations = optimizer.combination_generator.generate_exacta_combinations(
-                calibrated_horses, max_combinations
-            )
-        elif bet_type == 'trifecta':
-            combinations = optimizer.combination_generator.generate_trifecta_combinations(
-                calibrated_horses, max_combinations
-            )
-        elif bet_type == 'superfecta':
-            combinations = optimizer.combination_generator.generate_superfecta_combinations(
-                calibrated_horses, max_combinations
-            )
-        
-        # Format response
-        response = {
-            'status': 'success',
-            'bet_type': bet_type,
-            'total_combinations': len(combinations),
-            'combinations': [
-                {
-                    'combination': combo.combination,
-                    'probability': combo.probability,
-                    'expected_value': combo.expected_value,
-                    'kelly_fraction': combo.kelly_fraction,
-                    'confidence_score': combo.confidence_score,
-                    'payout_odds': combo.payout_odds
-                }
-                for combo in combinations
-            ],
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        return jsonify(response)
+        # Calibrated horses and combinations are cached per field, bet type and count
+        combinations = _combination_copies(horse_fingerprint(horses), bet_type, data.max_combinations)
         
+        # Stream the response; the first batch is encoded here, the rest after the handler returns
+        first_chunk = _combinations_head(bet_type, combinations)
+        return StreamingResponse(_stream_combinations(first_chunk, combinations), media_type='application/json')
+    
     except Exception as e:
         logger.error(f"Error in generate_combinations: {str(e)}")
-        return jsonify({'error': 'Internal server error', 'message': str(e)}), 500
+        return _JsonResponse(status_code=500, content={'error': 'Internal server error', 'message': str(e)})
 
 
-@exotic_bp.route('/signals', methods=['POST'])
-def generate_ev_signals():
+@exotic_router.post('/signals')
+def generate_ev_signals(data: HorsesRequest):
     """
     Generate EV signals for profitable betting opportunities
     """
     try:
-        data = request.get_json()
-        
-        if not data or 'horses' not in data:
-            return jsonify({'error': 'Missing required field: horses'}), 400
-        
-        horses = []
-        for horse_data in data['horses']:
-            horse = Horse(
-                id=horse_data['id'],
-                name=horse_data['name'],
-                win_probability=horse_data.get('win_probability', 0.1),
-                place_probability=horse_data.get('place_probability', 0.2),
-                show_probability=horse_data.get('show_probability', 0.3),
-                odds=horse_data['odds'],
-                jockey=horse_data.get('jockey', 'Unknown'),
-                trainer=horse_data.get('trainer', 'Unknown'),
-                form_rating=horse_data.get('form_rating', 75.0),
-                speed_rating=horse_data.get('speed_rating', 80.0),
-                class_rating=horse_data.get('class_rating', 75.0)
-            )
-            horses.append(horse)
+        fingerprint = horse_fingerprint(parse_horses(data.horses))
         
-        # Run full optimization to get all exotic bets
-        calibrated_horses = optimizer.calibrator.calibrate_win_probabilities(horses)
-        
-        exacta_bets = optimizer.combination_generator.generate_exacta_combinations(calibrated_horses)
-        trifecta_bets = optimizer.combination_generator.generate_trifecta_combinations(calibrated_horses)
-        superfecta_bets = optimizer.combination_generator.generate_superfecta_combinations(calibrated_horses)
-        
-        all_exotic_bets = exacta_bets + trifecta_bets + superfecta_bets
+        # Run full optimization to get all exotic bets (calibration and combinations are cached)
+        all_exotic_bets = [
+            bet
+            for bet_type in _GENERATORS
+            for bet in _combination_copies(fingerprint, bet_type)
+        ]
         
         # Generate EV signals
         ev_signals = optimizer.signal_generator.generate_ev_signals(all_exotic_bets)
         
+        # Reduce EVs and stakes in numpy instead of one Python pass per statistic
+        n = len(ev_signals)
+        ev = np.fromiter((s['expected_value'] for s in ev_signals), dtype=np.float64, count=n)
+        stakes = np.fromiter((s['recommended_stake'] for s in ev_signals), dtype=np.float64, count=n)
+        
         response = {
             'status': 'success',
-            'total_signals': len(ev_signals),
-            'profitable_opportunities': len([s for s in ev_signals if s['expected_value'] > 0]),
+            'total_signals': n,
+            'profitable_opportunities': int(np.count_nonzero(ev > 0)),
             'signals': ev_signals,
             'summary': {
-                'avg_expected_value': sum(s['expected_value'] for s in ev_signals) / len(ev_signals) if ev_signals else 0,
-                'max_expected_value': max((s['expected_value'] for s in ev_signals), default=0),
-                'total_recommended_stake': sum(s['recommended_stake'] for s in ev_signals)
+                'avg_expected_value': float(ev.mean()) if n else 0,
+                'max_expected_value': float(ev.max()) if n else 0,
+                'total_recommended_stake': float(stakes.sum()) if n else 0
             },
-            'timestamp': datetime.now().isoformat()
+            'timestamp': _timestamp()
         }
         
-        return jsonify(response)
-        
+        return _JsonResponse(response)
+    
     except Exception as e:
         logger.error(f"Error in generate_ev_signals: {str(e)}")
-        return jsonify({'error': 'Internal server error', 'message': str(e)}), 500
+        return _JsonResponse(status_code=500, content={'error': 'Internal server error', 'message': str(e)})
 
 
-@exotic_bp.route('/analytics/performance', methods=['GET'])
+@exotic_router.get('/analytics/performance')
 def get_performance_analytics():
     """Get historical performance analytics"""
     try:
@@ -343,7 +427,7 @@ def get_performance_analytics():
         top_signals = optimizer.signal_generator.get_top_signals(20)
         
         if not top_signals:
-            return jsonify({
+            return _JsonResponse({
                 'status': 'success',
                 'message': 'No historical data available',
                 'data': {
@@ -352,21 +436,24 @@ def get_performance_analytics():
                 }
             })
         
-        # Calculate performance metrics
+        # Calculate performance metrics in a single pass over the signals
+        total_strength = total_ev = 0.0
+        risk_counts, bet_type_counts = Counter(), Counter()
+        for s in top_signals:
+            total_strength += s['signal_strength']
+            total_ev += s['expected_value']
+            risk_counts[s['risk_level']] += 1
+            bet_type_counts[s['bet_type']] += 1
+        
         performance_metrics = {
             'total_historical_signals': len(top_signals),
-            'avg_signal_strength': sum(s['signal_strength'] for s in top_signals) / len(top_signals),
-            'avg_expected_value': sum(s['expected_value'] for s in top_signals) / len(top_signals),
+            'avg_signal_strength': total_strength / len(top_signals),
+            'avg_expected_value': total_ev / len(top_signals),
             'risk_distribution': {
-                'LOW': len([s for s in top_signals if s['risk_level'] == 'LOW']),
-                'MEDIUM': len([s for s in top_signals if s['risk_level'] == 'MEDIUM']),
-                'HIGH': len([s for s in top_signals if s['risk_level'] == 'HIGH']),
-                'VERY_HIGH': len([s for s in top_signals if s['risk_level'] == 'VERY_HIGH'])
+                level: risk_counts[level] for level in ('LOW', 'MEDIUM', 'HIGH', 'VERY_HIGH')
             },
             'bet_type_distribution': {
-                'exacta': len([s for s in top_signals if s['bet_type'] == 'exacta']),
-                'trifecta': len([s for s in top_signals if s['bet_type'] == 'trifecta']),
-                'superfecta': len([s for s in top_signals if s['bet_type'] == 'superfecta'])
+                bet_type: bet_type_counts[bet_type] for bet_type in ('exacta', 'trifecta', 'superfecta')
             }
         }
         
@@ -375,29 +462,32 @@ def get_performance_analytics():
             'data': {
                 'performance_metrics': performance_metrics,
                 'top_signals': top_signals[:10],
-                'timestamp': datetime.now().isoformat()
+                'timestamp': _timestamp()
             }
         }
         
-        return jsonify(response)
-        
+        return _JsonResponse(response)
+    
     except Exception as e:
         logger.error(f"Error in get_performance_analytics: {str(e)}")
-        return jsonify({'error': 'Internal server error', 'message': str(e)}), 500
+        return _JsonResponse(status_code=500, content={'error': 'Internal server error', 'message': str(e)})
 
 
-# Initialize Flask app for standalone testing
-def create_app():
-    """Create Flask app with CORS enabled"""
-    app = Flask(__name__)
-    CORS(app)
+# Initialize FastAPI app for standalone serving
+def create_app() -> FastAPI:
+    """Create FastAPI app with CORS and response compression enabled"""
+    app = FastAPI(title='Exotic Bet Optimizer API', version='1.0.0')
+    app.add_middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])
+    # Combination/signal payloads repeat the same keys and compress well; small bodies are sent as-is
+    app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+    app.add_exception_handler(RequestValidationError, validation_error_handler)
     
-    # Register blueprint
-    app.register_blueprint(exotic_bp)
+    # Register router
+    app.include_router(exotic_router)
     
-    @app.route('/')
+    @app.get('/')
     def index():
-        return jsonify({
+        return _JsonResponse({
             'service': 'Exotic Bet Optimizer API',
             'version': '1.0.0',
             'endpoints': [
@@ -413,6 +503,18 @@ def create_app():
     return app
 
 
+# ASGI entry point: uvicorn exotic_bet_api:app --workers N --loop uvloop
+app = create_app()
+
+
 if __name__ == '__main__':
-    app = create_app()
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    import uvicorn
+    
+    # Handlers are sync defs: FastAPI runs them in its threadpool, so the event loop keeps accepting requests
+    uvicorn.run(
+        'exotic_bet_api:app',
+        host='0.0.0.0',
+        port=5000,
+        workers=int(os.getenv('API_WORKERS', '1')),
+        loop='auto',  # uvloop when installed (uvicorn[standard])
+    )
@@ -1,7 +1,17 @@
+import axios from 'axios';
 import { spawn } from 'child_process';
 import * as path from 'path';
 
+// Long-lived Python ML service (src/services/ml_api_service.py) that keeps models loaded between calls.
+// Set ML_API_URL to use a separately deployed service (started with ML_API_HOST=0.0.0.0); otherwise
+// this process starts its own on 127.0.0.1 the first time a prediction finds nothing listening.
+const ML_API_URL = process.env.ML_API_URL;
+const ML_API_PORT = process.env.ML_API_PORT || '8001';
+const LOCAL_ML_API_URL = `http://127.0.0.1:${ML_API_PORT}`;
 const ML_SCRIPT_PATH = path.join(__dirname, 'ml_api_service.py');
+// Models load before the service starts listening, so allow for a slow first start
+const STARTUP_TIMEOUT_MS = 60000;
+const STARTUP_POLL_MS = 250;
 
 interface PredictionInput {
     [key: string]: any;
@@ -12,52 +22,101 @@ interface PredictionOutput {
     confidence: number;
 }
 
+let localService: Promise<void> | null = null;
+
+async function isHealthy(): Promise<boolean> {
+    try {
+        await axios.get(`${LOCAL_ML_API_URL}/health`, { timeout: 1000 });
+        return true;
+    } catch {
+        return false;
+    }
+}
+
 /**
- * Calls the Python ML model script with input data and returns the predictions.
- * @param inputData An array of feature objects for each horse.
- * @returns A promise that resolves to an array of prediction results.
+ * Starts the local ML service and resolves once it answers /health.
+ * If the child exits early (e.g. another process already holds the port), an existing healthy service is used.
  */
-export function getMlPredictions(inputData: PredictionInput[]): Promise<PredictionOutput[]> {
+function startLocalService(): Promise<void> {
     return new Promise((resolve, reject) => {
-        const pythonProcess = spawn('python3', [ML_SCRIPT_PATH]);
-        let output = '';
-        let error = '';
+        const pythonProcess = spawn('python3', [ML_SCRIPT_PATH], {
+            env: { ...process.env, ML_API_HOST: '127.0.0.1', ML_API_PORT },
+            stdio: ['ignore', 'inherit', 'inherit'],
+        });
+        let exited = false;
+        const deadline = Date.now() + STARTUP_TIMEOUT_MS;
 
-        // Send input data to the Python script's stdin
-        pythonProcess.stdin.write(JSON.stringify(inputData));
-        pythonProcess.stdin.end();
+        const stop = () => pythonProcess.kill();
+        process.on('exit', stop);
 
-        // Collect data from stdout
-        pythonProcess.stdout.on('data', (data) => {
-            output += data.toString();
+        // Handle process error (e.g., python not found)
+        pythonProcess.on('error', (err) => {
+            exited = true;
+            reject(new Error(`Failed to start ML process: ${err.message}`));
         });
 
-        // Collect data from stderr
-        pythonProcess.stderr.on('data', (data) => {
-            error += data.toString();
+        // Start again on the next prediction if the service goes away
+        pythonProcess.on('exit', (code) => {
+            exited = true;
+            localService = null;
+            process.removeListener('exit', stop);
+            console.error(`ML service exited with code ${code}`);
         });
 
-        // Handle process exit
-        pythonProcess.on('close', (code) => {
-            if (code !== 0) {
-                console.error(`ML script exited with code ${code}`);
-                console.error(`ML script stderr: ${error}`);
-                return reject(new Error(`ML prediction failed: ${error}`));
+        const poll = async () => {
+            if (await isHealthy()) {
+                return resolve();
             }
-
-            try {
-                const predictions = JSON.parse(output);
-                resolve(predictions);
-            } catch (e) {
-                console.error(`Failed to parse ML script output: ${output}`);
-                console.error(`ML script stderr: ${error}`);
-                reject(new Error(`Failed to parse ML script output: ${e}`));
+            if (exited || Date.now() > deadline) {
+                stop();
+                return reject(new Error(`ML service did not become healthy on ${LOCAL_ML_API_URL}`));
             }
-        });
+            setTimeout(poll, STARTUP_POLL_MS);
+        };
+        poll();
+    });
+}
 
-        // Handle process error (e.g., python not found)
-        pythonProcess.on('error', (err) => {
-            reject(new Error(`Failed to start ML process: ${err.message}`));
+function ensureLocalService(): Promise<void> {
+    if (!localService) {
+        localService = startLocalService().catch((e) => {
+            localService = null;
+            throw e;
         });
-    });
+    }
+    return localService;
+}
+
+async function postPredictions(baseUrl: string, inputData: PredictionInput[]): Promise<PredictionOutput[]> {
+    const response = await axios.post<PredictionOutput[]>(`${baseUrl}/predict`, inputData);
+    return response.data;
+}
+
+function predictionError(e: any): Error {
+    const detail = e.response ? JSON.stringify(e.response.data) : e.message;
+    console.error(`ML prediction request failed: ${detail}`);
+    return new Error(`ML prediction failed: ${detail}`);
+}
+
+/**
+ * Calls the Python ML prediction service with input data and returns the predictions.
+ * @param inputData An array of feature objects for each horse.
+ * @returns A promise that resolves to an array of prediction results.
+ */
+export async function getMlPredictions(inputData: PredictionInput[]): Promise<PredictionOutput[]> {
+    try {
+        return await postPredictions(ML_API_URL || LOCAL_ML_API_URL, inputData);
+    } catch (e: any) {
+        if (ML_API_URL || e.code !== 'ECONNREFUSED') {
+            throw predictionError(e);
+        }
+    }
+
+    // Nothing listening locally yet: start the service and retry once it is up
+    try {
+        await ensureLocalService();
+        return await postPredictions(LOCAL_ML_API_URL, inputData);
+    } catch (e: any) {
+        throw predictionError(e);
+    }
 }
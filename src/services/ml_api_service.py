@@ -1,23 +1,40 @@
-import pandas as pd
 import numpy as np
 import joblib
 import os
 import logging
-import json
 import sys
+import warnings
+from contextlib import asynccontextmanager
 from io import StringIO
+from typing import Any, Dict, List
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
 # --- Configuration ---
 TARGET_COL = 'relevance_score'
 GROUP_COL = 'race_id'
 # Note: In an API context, we won't be loading from a fixed file path.
-# We will receive data via stdin.
+# We receive data as the JSON body of POST /predict.
 ENSEMBLE_MODEL_PATH = '/home/ubuntu/ensemble_ranking_model_large.pkl'
+FEATURE_COLUMNS_PATH = '/home/ubuntu/feature_columns.pkl'
 
 # --- Logging Setup ---
-# Set up a logger that writes to stderr so it doesn't interfere with stdout JSON output
+# Set up a logger that writes to stderr, alongside the server's access log
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.WARNING) # Only log warnings and errors to keep stdout clean
+logger.setLevel(logging.WARNING) # Only log warnings and errors
 handler = logging.StreamHandler(sys.stderr)
 formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 handler.setFormatter(formatter)
@@ -25,40 +42,114 @@ logger.addHandler(handler)
 
 # Global variable to hold loaded models to avoid reloading on every API call
 _MODELS = None
+# Models loaded by load_base_models, keyed by the resolved model directory
+_MODEL_CACHE = {}
+
+# Mock models only score when explicitly allowed (local development with mock artifacts)
+_ALLOW_MOCK_MODEL = os.getenv('ALLOW_MOCK_MODEL') == '1'
+# Seeded PCG64 generator shared by all mock models, so mock scores are reproducible
+_RNG = np.random.default_rng(0)
 
 # Create a simple class to mock a model with a predict_proba method
 # This is necessary because joblib/pickle needs the class definition to unpickle the object.
 class MockModel:
+    def _check_allowed(self):
+        # Mock scores are random: refuse to serve them unless explicitly enabled for development
+        if not _ALLOW_MOCK_MODEL:
+            raise RuntimeError('MockModel invoked without ALLOW_MOCK_MODEL=1')
+
     def predict_proba(self, X):
+        self._check_allowed()
         # Return a random probability array for each sample
         n_samples = X.shape[0]
+        # Fill both columns in place; Fortran order keeps each column contiguous for Generator.random(out=...)
+        out = np.empty((n_samples, 2), order='F')
+        probs = out[:, 1]
         # Simulate a prediction: 50% chance of 0, 50% chance of 1
-        probs = np.random.rand(n_samples) * 0.2 + 0.4 # Range 0.4 to 0.6
-        return np.column_stack([1 - probs, probs])
+        _RNG.random(out=probs)
+        probs *= 0.2
+        probs += 0.4 # Range 0.4 to 0.6
+        np.subtract(1.0, probs, out=out[:, 0])
+        return out
     
     def predict(self, X):
+        self._check_allowed()
         # Mock for the ranker
         n_samples = X.shape[0]
-        return np.random.rand(n_samples) # Return a ranking score
+        return _RNG.random(n_samples) # Return a ranking score
+
+def _load_artifact(path):
+    """joblib.load with numpy arrays memory-mapped read-only, so forked workers share their pages"""
+    with warnings.catch_warnings():
+        # Compressed archives and plain pickles cannot be mapped; they load into memory as usual
+        warnings.filterwarnings('ignore', message='mmap_mode', category=UserWarning)
+        return joblib.load(path, mmap_mode='r')
+
+# Classifiers scored through predict_proba, in ensemble order
+CLASSIFIER_NAMES = ('logistic_regression', 'random_forest', 'gradient_boosting', 'xgboost', 'lightgbm_old')
+
+def _active_classifiers(models):
+    """(name, bound predict_proba, uses scaled input) for each loaded classifier that can score"""
+    active = []
+    for name in CLASSIFIER_NAMES:
+        if name in models:
+            # Check if the model has predict_proba
+            if hasattr(models[name], 'predict_proba'):
+                active.append((name, models[name].predict_proba, name == 'logistic_regression'))
+            else:
+                logger.warning(f"Model {name} does not have predict_proba. Skipping.")
+    return active
+
+def _has_scoring_models(models):
+    """Whether any loaded model can score: the ranker or an active classifier"""
+    if not models:
+        return False
+    active = models.get('_active')
+    if active is None:
+        active = _active_classifiers(models)
+    return bool(active) or 'lgbm_ranker' in models
+
+def _default_model_dir():
+    """The repo's models directory, or /home/ubuntu/ when it doesn't exist"""
+    # Use relative path from the script location
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    model_dir = os.path.join(script_dir, '..', '..', 'models')
+    # Fallback to /home/ubuntu if models directory doesn't exist
+    if not os.path.exists(model_dir):
+        model_dir = '/home/ubuntu/'
+    return model_dir
 
 def load_base_models(model_dir=None):
-    """Loads all base models for the ensemble."""
-    if model_dir is None:
-        # Use relative path from the script location
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        model_dir = os.path.join(script_dir, '..', '..', 'models')
-        # Fallback to /home/ubuntu if models directory doesn't exist
-        if not os.path.exists(model_dir):
-            model_dir = '/home/ubuntu/'
+    """Loads all base models for the ensemble, once per model directory.
+
+    Without model_dir, returns the service's models (_MODELS), loaded from the default location.
+    """
     global _MODELS
-    if _MODELS is not None:
+    if model_dir is None:
+        if _MODELS is None:
+            _MODELS = load_base_models(_default_model_dir())
         return _MODELS
+    key = os.path.realpath(model_dir)
+    models = _MODEL_CACHE.get(key)
+    if models is None:
+        models = _MODEL_CACHE[key] = _load_models(model_dir)
+    return models
+
+def _load_models(model_dir):
+    """Loads the base models, scaler and feature columns found in model_dir"""
+    # Prefer the single archive written by create_mock_models.py: one load instead of one per model
+    bundle_path = os.path.join(model_dir, 'bundle.joblib')
+    if os.path.exists(bundle_path):
+        models = dict(_load_artifact(bundle_path))
+        logger.info(f"Loaded model bundle with entries: {sorted(models)}")
+        models['_active'] = _active_classifiers(models)
+        return models
 
     models = {}
     
     # Load the newly trained LightGBM Ranker (from the large dataset)
     try:
-        models['lgbm_ranker'] = joblib.load(os.path.join(model_dir, 'lightgbm_ranker_large.pkl'))
+        models['lgbm_ranker'] = _load_artifact(os.path.join(model_dir, 'lightgbm_ranker_large.pkl'))
         logger.info("Loaded new LightGBM Ranker (large data).")
     except FileNotFoundError:
         logger.warning("New LightGBM Ranker (large data) not found. Skipping.")
@@ -74,69 +165,110 @@ def load_base_models(model_dir=None):
     
     for name, filename in model_files.items():
         try:
-            models[name] = joblib.load(os.path.join(model_dir, filename))
+            models[name] = _load_artifact(os.path.join(model_dir, filename))
             logger.info(f"Loaded pre-trained model: {name}")
         except Exception as e:
             logger.warning(f"Could not load pre-trained model {name} from {filename}: {e}. Skipping.")
         
     # Load scaler
     try:
-        scaler = joblib.load(os.path.join(model_dir, 'scaler.pkl'))
+        scaler = _load_artifact(os.path.join(model_dir, 'scaler.pkl'))
         models['scaler'] = scaler
         logger.info("Loaded scaler.")
     except FileNotFoundError:
         logger.warning("Scaler not found. Skipping scaling for LR model.")
         
-    _MODELS = models
+    # Load the feature columns used by the pre-trained models once, instead of on every request
+    for path in dict.fromkeys([os.path.join(model_dir, 'feature_columns.pkl'), FEATURE_COLUMNS_PATH]):
+        try:
+            models['feature_columns'] = _load_artifact(path)
+            break
+        except Exception:
+            continue
+    else:
+        logger.warning("Feature columns not found. Base models will use the first input features.")
+        
+    # Resolve the scoring models once instead of on every request
+    models['_active'] = _active_classifiers(models)
     return models
 
+# Load at import so the first request is already warm, and a preloading server
+# (gunicorn --preload) shares the mapped model pages across its forked workers
+try:
+    load_base_models()
+except Exception as e:
+    logger.error(f"Model preload failed: {e}. Models will load on first request.")
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True)
+    def _row_mean(scores):
+        """Mean of each row of the (n_samples, n_models) score buffer"""
+        n_rows, n_cols = scores.shape
+        out = np.empty(n_rows)
+        for i in range(n_rows):
+            total = 0.0
+            for j in range(n_cols):
+                total += scores[i, j]
+            out[i] = total / n_cols
+        return out
+else:
+    def _row_mean(scores):
+        """Mean of each row of the (n_samples, n_models) score buffer"""
+        return scores.mean(axis=1)
+
+def _feature_matrix(input_data, columns):
+    """(n_rows, n_columns) float64 array of the given features; missing keys and null values become NaN"""
+    n_rows, n_cols = len(input_data), len(columns)
+    return np.fromiter(
+        (v if (v := row.get(col)) is not None else np.nan for row in input_data for col in columns),
+        dtype=np.float64, count=n_rows * n_cols
+    ).reshape(n_rows, n_cols)
+
 def create_ensemble_predictions(X_full, X_base, models):
     """Generates predictions from all base models and combines them."""
     
-    # Scale data for LR model if scaler is available
-    X_base_scaled = X_base.copy()
+    # Scale data for LR model if scaler is available (transform returns a new array; X_base is never copied)
+    X_base_scaled = X_base
     if 'scaler' in models:
         try:
             X_base_scaled = models['scaler'].transform(X_base)
         except Exception as e:
             logger.warning(f"Scaling failed: {e}. Using unscaled data for LR.")
-            X_base_scaled = X_base
+    
+    # Precomputed by load_base_models; resolved here for model dicts built elsewhere
+    active = models.get('_active')
+    if active is None:
+        active = _active_classifiers(models)
     
     # --- 1. Generate Base Predictions (Scores) ---
-    predictions = pd.DataFrame(index=X_full.index)
+    # One column per base model; successful models fill the first n_scores columns
+    scores = np.empty((len(X_base), 1 + len(active)), dtype=np.float64)
+    n_scores = 0
     
     # New LightGBM Ranker (uses full features)
-    if 'lgbm_ranker' in models:
+    if 'lgbm_ranker' in models and X_full is not None:
         try:
-            predictions['lgbm_ranker_score'] = models['lgbm_ranker'].predict(X_full)
+            scores[:, n_scores] = models['lgbm_ranker'].predict(X_full)
+            n_scores += 1
         except Exception as e:
             logger.warning(f"Prediction failed for new LightGBM Ranker due to error: {e}. Skipping this model.")
         
     # Classification Models (predict_proba for ranking score)
-    for name in ['logistic_regression', 'random_forest', 'gradient_boosting', 'xgboost', 'lightgbm_old']:
-        if name in models:
-            # Use scaled base data for LR, raw base data for tree-based models
-            data = X_base_scaled if name == 'logistic_regression' and 'scaler' in models else X_base
-            
-            # Check if the model has predict_proba
-            if hasattr(models[name], 'predict_proba'):
-                try:
-                    predictions[f'{name}_score'] = models[name].predict_proba(data)[:, 1]
-                except Exception as e:
-                    logger.warning(f"Prediction failed for model {name} due to error: {e}. Skipping this model.")
-            else:
-                logger.warning(f"Model {name} does not have predict_proba. Skipping.")
+    for name, predict_proba, uses_scaled in active:
+        # Use scaled base data for LR (unscaled without a scaler), raw base data for tree-based models
+        data = X_base_scaled if uses_scaled else X_base
+        try:
+            scores[:, n_scores] = predict_proba(data)[:, 1]
+            n_scores += 1
+        except Exception as e:
+            logger.warning(f"Prediction failed for model {name} due to error: {e}. Skipping this model.")
 
     # --- 2. Ensemble Strategy: Simple Averaging ---
-    score_cols = [col for col in predictions.columns if '_score' in col]
-    
-    if not score_cols:
+    if not n_scores:
         logger.error("No base model scores were generated. Cannot create ensemble.")
         return None
         
-    predictions['ensemble_score'] = predictions[score_cols].mean(axis=1)
-    
-    return predictions['ensemble_score'].tolist()
+    return _row_mean(scores[:, :n_scores]).tolist()
 
 def get_predictions(input_data: list):
     """
@@ -147,44 +279,50 @@ def get_predictions(input_data: list):
 
     # 1. Load models
     models = load_base_models()
-    if not models:
+    if not _has_scoring_models(models):
         logger.error("No models loaded. Cannot make predictions.")
         return []
 
-    # 2. Convert input data to DataFrame
-    df = pd.DataFrame(input_data)
-    
-    # 3. Prepare feature sets
+    # 2. Prepare feature sets
     # Assuming all necessary features are present in the input_data
-    all_feature_cols = df.columns.tolist()
+    # Every key seen across the rows, in first-seen order
+    all_feature_cols = list(dict.fromkeys(col for row in input_data for col in row))
     
-    # Load the feature columns used by the pre-trained models (if available)
-    try:
-        base_model_feature_cols = joblib.load('/home/ubuntu/feature_columns.pkl')
-    except Exception:
+    # Feature columns used by the pre-trained models, cached by load_base_models (if available)
+    base_model_feature_cols = models.get('feature_columns')
+    if base_model_feature_cols is None:
         # Fallback: Use a subset of the first 12 features as a proxy for the base models
         # This is a dangerous assumption but necessary without the actual model files
         base_model_feature_cols = [col for col in all_feature_cols if col not in [TARGET_COL, GROUP_COL]][:12]
         
     # The new LightGBM Ranker was trained on all features, but the base models were trained on a subset.
-    X_full = df
+    try:
+        X_full = _feature_matrix(input_data, all_feature_cols)
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Non-numeric features ({e}). Skipping the full-feature ranker.")
+        X_full = None
     
     # Create the subset X for base models
-    try:
-        X_base = X_full[base_model_feature_cols]
-    except KeyError as e:
-        logger.warning(f"Feature mismatch for base models: {e}. Falling back to a subset of features.")
+    missing = [col for col in base_model_feature_cols if col not in all_feature_cols]
+    if missing:
+        logger.warning(f"Feature mismatch for base models: {missing}. Falling back to a subset of features.")
         # Use the first N columns as the base features, where N is the number of features in the base model
-        X_base = X_full.iloc[:, :len(base_model_feature_cols)]
-        X_base.columns = base_model_feature_cols # Rename to match the scaler's expected input
+        base_columns = all_feature_cols[:len(base_model_feature_cols)]
+    else:
+        base_columns = base_model_feature_cols
+    try:
+        X_base = _feature_matrix(input_data, base_columns)
+    except (TypeError, ValueError) as e:
+        logger.error(f"Non-numeric base model features: {e}. Cannot make predictions.")
+        return []
 
-    # 4. Generate predictions
+    # 3. Generate predictions
     scores = create_ensemble_predictions(X_full, X_base, models)
     
     if scores is None:
         return []
 
-    # 5. Format output
+    # 4. Format output
     results = []
     for score in scores:
         # Simple confidence calculation: closer to 0.5 is lower confidence
@@ -196,23 +334,45 @@ def get_predictions(input_data: list):
         
     return results
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load models once per process so every request hits the warm _MODELS cache
+    load_base_models()
+    yield
+
+
+class OrjsonResponse(JSONResponse):
+    """JSON response encoded by orjson, serializing numpy scalars and arrays natively"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+# Returning responses directly skips FastAPI's jsonable_encoder pass
+_JsonResponse = OrjsonResponse if ORJSON_AVAILABLE else JSONResponse
+
+app = FastAPI(title="Equine Oracle ML API", lifespan=lifespan)
+
+
+@app.post("/predict")
+def predict(input_data: List[Dict[str, Any]]):
+    """Prediction scores for a list of feature dictionaries (one per horse)"""
+    # Sync handler: FastAPI runs it in the threadpool, keeping the event loop free
+    return _JsonResponse(get_predictions(input_data))
+
+
+@app.get("/health")
+def health():
+    return {"status": "healthy", "models_loaded": _has_scoring_models(_MODELS)}
+
+
+# mlPredictionService.ts starts this on 127.0.0.1 when ML_API_URL is unset. To run it as a
+# separate service instead, start it with ML_API_HOST=0.0.0.0 and set ML_API_URL for the Node processes.
 if __name__ == "__main__":
-    try:
-        # Read all input from stdin
-        input_json = sys.stdin.read()
-        
-        # Parse the JSON input
-        input_data = json.loads(input_json)
-        
-        # Get predictions
-        predictions = get_predictions(input_data)
-        
-        # Print the result as JSON to stdout
-        print(json.dumps(predictions))
-        
-    except Exception as e:
-        # Print error to stderr to avoid corrupting stdout JSON
-        logger.error(f"An error occurred during prediction: {e}")
-        # Print an empty array to stdout to signal failure to the caller
-        print(json.dumps([]))
-        sys.exit(1)
+    import uvicorn
+
+    uvicorn.run(
+        app,
+        host=os.getenv('ML_API_HOST', '127.0.0.1'),
+        port=int(os.getenv('ML_API_PORT', '8001')),
+    )
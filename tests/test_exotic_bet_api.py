@@ -0,0 +1,126 @@
+"""
+Tests for the exotic betting API request handling
+
+Run with: python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+from fastapi import FastAPI
+from fastapi.exceptions import RequestValidationError
+from fastapi.testclient import TestClient
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'server', 'exotic_betting'))
+
+import exotic_bet_api  # noqa: E402
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.include_router(exotic_bet_api.exotic_router)
+    app.add_exception_handler(RequestValidationError, exotic_bet_api.validation_error_handler)
+    return TestClient(app)
+
+
+def _horses(ids, names=None):
+    names = names or [f"Horse {i}" for i in range(len(ids))]
+    return [
+        {'id': horse_id, 'name': name, 'odds': 2.0 + i, 'win_probability': 0.4 - 0.05 * i}
+        for i, (horse_id, name) in enumerate(zip(ids, names))
+    ]
+
+
+class ExoticBetAPITest(unittest.TestCase):
+    """Request bodies the Flask API accepted keep working"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = _client()
+
+    def test_string_horse_ids_are_passed_through(self):
+        response = self.client.post('/api/v1/exotic/probabilities/calibrate',
+                                    json={'horses': _horses(['H1', '3', 'H7'])})
+        self.assertEqual(response.status_code, 200)
+        ids = [h['id'] for h in response.json()['calibrated_horses']]
+        self.assertCountEqual(ids, ['H1', '3', 'H7'])
+
+    def test_non_string_names_are_passed_through(self):
+        response = self.client.post('/api/v1/exotic/probabilities/calibrate',
+                                    json={'horses': _horses([1, 2, 3], names=[7, None, 'Three'])})
+        self.assertEqual(response.status_code, 200)
+        names = {h['id']: h['name'] for h in response.json()['calibrated_horses']}
+        self.assertEqual(names, {1: 7, 2: None, 3: 'Three'})
+
+    def test_string_ids_in_combinations(self):
+        response = self.client.post('/api/v1/exotic/combinations/exacta',
+                                    json={'horses': _horses(['A', 'B', 'C', 'D'])})
+        self.assertEqual(response.status_code, 200)
+        for combo in response.json()['combinations']:
+            self.assertTrue(set(combo['combination']) <= {'A', 'B', 'C', 'D'})
+
+    def test_invalid_bet_type_reported_before_body_errors(self):
+        response = self.client.post('/api/v1/exotic/combinations/quinella', json={})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Invalid bet type. Supported: exacta, trifecta, superfecta')
+
+    def test_missing_horse_field(self):
+        response = self.client.post('/api/v1/exotic/optimize', json={'horses': [{'id': 1, 'name': 'A'}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], "Missing required horse field: 'odds'")
+
+    def test_optimize_uses_the_field_cache(self):
+        body = {'horses': _horses(['X1', 'X2', 'X3', 'X4', 'X5'])}
+        first = self.client.post('/api/v1/exotic/optimize', json=body)
+        hits = exotic_bet_api._calibrated_horses.cache_info().hits
+        second = self.client.post('/api/v1/exotic/optimize', json=body)
+        self.assertEqual(second.status_code, 200)
+        self.assertGreater(exotic_bet_api._calibrated_horses.cache_info().hits, hits)
+        for key in ('total_horses', 'exotic_combinations', 'summary_stats'):
+            self.assertEqual(first.json()['data'][key], second.json()['data'][key])
+        strip = lambda signals: [{k: v for k, v in s.items() if k != 'timestamp'} for s in signals]
+        self.assertEqual(strip(first.json()['data']['top_opportunities']),
+                         strip(second.json()['data']['top_opportunities']))
+
+    def test_cached_objects_are_not_handed_out(self):
+        fingerprint = exotic_bet_api.horse_fingerprint(
+            exotic_bet_api.parse_horses([exotic_bet_api.HorseIn(**h) for h in _horses([1, 2, 3, 4])])
+        )
+        copies = exotic_bet_api._combination_copies(fingerprint, 'exacta')
+        copies[0].combination.reverse()
+        copies[0].expected_value = -1.0
+        cached = exotic_bet_api._bet_combinations(fingerprint, 'exacta')[0]
+        self.assertNotEqual(cached.combination, copies[0].combination)
+        self.assertNotEqual(cached.expected_value, -1.0)
+
+        horses = exotic_bet_api._calibrated_copies(fingerprint)
+        horses[0].win_probability = 0.0
+        self.assertNotEqual(exotic_bet_api._calibrated_horses(fingerprint)[0].win_probability, 0.0)
+
+    def test_streamed_combinations_are_valid_json(self):
+        response = self.client.post('/api/v1/exotic/combinations/exacta',
+                                    json={'horses': _horses(list(range(1, 10))), 'max_combinations': 72})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertGreater(body['total_combinations'], exotic_bet_api._STREAM_BATCH)
+        self.assertEqual(len(body['combinations']), body['total_combinations'])
+
+    def test_encoding_failure_before_streaming_is_a_500(self):
+        with mock.patch.object(exotic_bet_api, '_encode_batch', side_effect=ValueError('bad value')):
+            response = self.client.post('/api/v1/exotic/combinations/exacta',
+                                        json={'horses': _horses([1, 2, 3])})
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json()['message'], 'bad value')
+
+    def test_encoding_failure_while_streaming_aborts_the_response(self):
+        with mock.patch.object(exotic_bet_api, '_encode_batch', side_effect=[b'{}', ValueError('bad value')]):
+            with self.assertLogs(exotic_bet_api.logger, 'ERROR'), self.assertRaises(ValueError):
+                self.client.post('/api/v1/exotic/combinations/exacta',
+                                 json={'horses': _horses(list(range(1, 10))), 'max_combinations': 72})
+
+
+if __name__ == '__main__':
+    unittest.main()
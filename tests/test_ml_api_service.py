@@ -0,0 +1,94 @@
+"""
+Tests for the feature handling of the ML prediction service
+
+Run with: python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+import joblib
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'src', 'services'))
+
+import ml_api_service  # noqa: E402
+
+FEATURES = ['speed_rating', 'form_rating', 'days_since_last_race']
+
+
+class MeanModel:
+    """Scores each row by the NaN-aware mean of its features"""
+
+    def predict_proba(self, X):
+        p = np.clip(np.nan_to_num(np.nanmean(X, axis=1)) / 100, 0, 1)
+        return np.column_stack([1 - p, p])
+
+
+class FeatureMatrixTest(unittest.TestCase):
+    """Missing and null feature values become NaN instead of failing the request"""
+
+    def setUp(self):
+        self._models = ml_api_service._MODELS
+        ml_api_service._MODELS = {'feature_columns': FEATURES, 'random_forest': MeanModel()}
+
+    def tearDown(self):
+        ml_api_service._MODELS = self._models
+
+    def test_null_and_missing_values_are_nan(self):
+        X = ml_api_service._feature_matrix(
+            [{'speed_rating': 80, 'form_rating': None}, {'speed_rating': 70.5, 'form_rating': 60}],
+            ['speed_rating', 'form_rating', 'days_since_last_race']
+        )
+        np.testing.assert_array_equal(X, [[80.0, np.nan, np.nan], [70.5, 60.0, np.nan]])
+
+    def test_prediction_with_null_feature(self):
+        rows = [
+            {'speed_rating': 80, 'form_rating': None, 'days_since_last_race': 20},
+            {'speed_rating': 60, 'form_rating': 70, 'days_since_last_race': 14},
+        ]
+        predictions = ml_api_service.get_predictions(rows)
+        self.assertEqual(len(predictions), 2)
+        self.assertAlmostEqual(predictions[0]['probability'], 0.5)
+        self.assertAlmostEqual(predictions[1]['probability'], 0.48)
+
+
+
+class LoadBaseModelsTest(unittest.TestCase):
+    """Models are cached per model directory"""
+
+    def test_each_directory_loads_its_own_models(self):
+        with tempfile.TemporaryDirectory() as first, tempfile.TemporaryDirectory() as second:
+            joblib.dump(FEATURES[:1], os.path.join(first, 'feature_columns.pkl'))
+            joblib.dump(FEATURES[1:], os.path.join(second, 'feature_columns.pkl'))
+            first_models = ml_api_service.load_base_models(first)
+            second_models = ml_api_service.load_base_models(second)
+            self.assertEqual(first_models['feature_columns'], FEATURES[:1])
+            self.assertEqual(second_models['feature_columns'], FEATURES[1:])
+            self.assertIs(ml_api_service.load_base_models(first), first_models)
+
+
+class EmptyModelDirectoryTest(unittest.TestCase):
+    """A model directory without any scoring model is not reported as loaded"""
+
+    def setUp(self):
+        self._models = ml_api_service._MODELS
+        self._dir = tempfile.TemporaryDirectory()
+        ml_api_service._MODELS = ml_api_service.load_base_models(self._dir.name)
+
+    def tearDown(self):
+        ml_api_service._MODELS = self._models
+        self._dir.cleanup()
+
+    def test_health_reports_no_models(self):
+        self.assertEqual(ml_api_service.health(), {"status": "healthy", "models_loaded": False})
+
+    def test_prediction_returns_empty(self):
+        self.assertEqual(ml_api_service.get_predictions([{'speed_rating': 80}]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
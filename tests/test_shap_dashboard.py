@@ -0,0 +1,100 @@
+"""
+Tests for the restricted unpickler used by the SHAP dashboard
+
+Run with: python -m unittest discover -s tests
+"""
+
+import importlib.util
+import os
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD_PATHS = (
+    os.path.join(REPO_ROOT, 'godtier_ensemble_v2', 'shap_dashboard.py'),
+    os.path.join(REPO_ROOT, 'server', 'monitoring', 'shap_dashboard.py'),
+)
+
+
+def _load_module(path: str, name: str):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+DASHBOARDS = [_load_module(path, f"shap_dashboard_{i}") for i, path in enumerate(DASHBOARD_PATHS)]
+
+
+class SafePickleLoadTest(unittest.TestCase):
+    """_safe_pickle_load refuses code-execution gadgets and loads real models"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.marker = os.path.join(self.tmp_dir.name, 'marker')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write(self, data: bytes) -> str:
+        path = os.path.join(self.tmp_dir.name, 'artifact.pkl')
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def _assert_refused(self, data: bytes):
+        path = self._write(data)
+        for dashboard in DASHBOARDS:
+            with self.subTest(dashboard=dashboard.__name__):
+                with self.assertRaises(pickle.UnpicklingError):
+                    dashboard._safe_pickle_load(path)
+                self.assertFalse(os.path.exists(self.marker))
+
+    def test_refuses_numpy_runstring(self):
+        code = f"open({self.marker!r}, 'w').close()"
+        self._assert_refused(
+            b"cnumpy.testing._private.utils\nrunstring\n(" + pickle.dumps(code, protocol=0)[:-1]
+            + b"(dtR."
+        )
+
+    def test_refuses_os_system(self):
+        self._assert_refused(
+            b"cos\nsystem\n(" + pickle.dumps(f"touch {self.marker}", protocol=0)[:-1] + b"tR."
+        )
+
+    def test_refuses_getattr_outside_prediction_methods(self):
+        # getattr(LogisticRegression, '__init__') would lead on to __globals__
+        self._assert_refused(
+            b"cbuiltins\ngetattr\n(csklearn.linear_model._logistic\nLogisticRegression\nV__init__\ntR."
+        )
+
+    def test_loads_sklearn_model(self):
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(50, 4))
+        model = LogisticRegression().fit(X, (X[:, 0] > 0).astype(int))
+
+        for protocol in (3, 4, 5):
+            path = self._write(pickle.dumps(model, protocol=protocol))
+            for dashboard in DASHBOARDS:
+                with self.subTest(dashboard=dashboard.__name__, protocol=protocol):
+                    loaded = dashboard._safe_pickle_load(path)
+                    np.testing.assert_array_equal(loaded.predict_proba(X), model.predict_proba(X))
+
+    def test_loads_bound_prediction_method(self):
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(50, 4))
+        model = LogisticRegression().fit(X, (X[:, 0] > 0).astype(int))
+
+        path = self._write(pickle.dumps(model.predict_proba))
+        for dashboard in DASHBOARDS:
+            with self.subTest(dashboard=dashboard.__name__):
+                loaded = dashboard._safe_pickle_load(path)
+                np.testing.assert_array_equal(loaded(X), model.predict_proba(X))
+
+
+if __name__ == '__main__':
+    unittest.main()